@@ -0,0 +1,199 @@
+"""Synthetic AppEEARS data shared by the benchmark scripts, so they run without AppEEARS."""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from mt_mesonet_satellite.Product import CACHE_VERSION, PRODUCT_CACHE
+
+
+def layer(
+    name: str,
+    units: str,
+    valid_min: float,
+    valid_max: float,
+    fill: float = -9999,
+    is_qa: bool = False,
+) -> Dict[str, Any]:
+    """Build the AppEEARS /product metadata of a layer."""
+    return {
+        "AddOffset": None,
+        "Available": True,
+        "DataType": "float32",
+        "Description": name,
+        "Dimensions": ["time"],
+        "FillValue": fill,
+        "IsQA": is_qa,
+        "Layer": name,
+        "OrigDataType": "float32",
+        "OrigValidMax": valid_max,
+        "OrigValidMin": valid_min,
+        "QualityLayers": "",
+        "QualityProductAndVersion": "",
+        "ScaleFactor": None,
+        "Units": units,
+        "ValidMax": valid_max,
+        "ValidMin": valid_min,
+        "XSize": 1,
+        "YSize": 1,
+    }
+
+
+def _layers(*layers: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {x["Layer"]: x for x in layers}
+
+
+PRODUCTS = {
+    "MOD16A2.061": _layers(
+        layer("ET_500m", "kg/m^2/8day", -32767, 32700, fill=32767),
+        layer("PET_500m", "kg/m^2/8day", -32767, 32700, fill=32767),
+        layer("ET_QC_500m", "none", 0, 254, fill=255, is_qa=True),
+    ),
+    "MOD13A1.061": _layers(
+        layer("_500m_16_days_NDVI", "NDVI", -2000, 10000, fill=-3000),
+        layer("_500m_16_days_EVI", "EVI", -2000, 10000, fill=-3000),
+    ),
+    "SPL4SMGP.007": _layers(
+        layer("Geophysical_Data_sm_surface", "m3/m3", 0, 0.9),
+        layer("Geophysical_Data_sm_rootzone", "m3/m3", 0, 0.9),
+        layer("Geophysical_Data_sm_surface_wetness", "unitless", 0, 1),
+        layer("Geophysical_Data_sm_rootzone_wetness", "unitless", 0, 1),
+    ),
+}
+
+
+def seed_product_cache(
+    cache_dir: Union[str, Path], products: Dict[str, Dict[str, Dict[str, Any]]]
+):
+    """Write product metadata to a product cache directory and use it for the rest of the run.
+
+    The ProductCache environment variable is also set, so worker processes use the same cache.
+
+    Args:
+        cache_dir (Union[str, Path]): Directory to write the cache files to.
+        products (Dict[str, Dict[str, Dict[str, Any]]]): Layer metadata of each product.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for product, layers in products.items():
+        entry = {
+            "version": CACHE_VERSION,
+            "fetched": time.time(),
+            "etag": None,
+            "layers": layers,
+        }
+        with open(cache_dir / f"{product}.json", "w") as con:
+            json.dump(entry, con)
+
+    os.environ["ProductCache"] = str(cache_dir)
+    PRODUCT_CACHE.cache_dir = cache_dir
+    PRODUCT_CACHE._memo.clear()
+
+
+def stations(n: int) -> List[str]:
+    return [f"bench{i:04d}" for i in range(n)]
+
+
+def write_appeears_csv(
+    dirname: Union[str, Path],
+    product: str,
+    n_stations: int,
+    n_dates: int,
+    layers: Optional[Dict[str, Dict[str, Any]]] = None,
+    hours: Optional[int] = None,
+    name: str = "bench",
+    seed: int = 0,
+) -> Path:
+    """Write a synthetic AppEEARS point extraction .csv.
+
+    About 5% of values are fill values and 2% are out of the valid range, so they are masked.
+
+    Args:
+        dirname (Union[str, Path]): Directory to write the file to.
+        product (str): The product name, e.g. 'MOD16A2.061'.
+        n_stations (int): Number of stations.
+        n_dates (int): Number of dates per station.
+        layers (Optional[Dict[str, Dict[str, Any]]], optional): Layer metadata. Defaults to PRODUCTS[product].
+        hours (Optional[int], optional): Number of observations per day for sub-daily products. Each layer then has one column per observation. Defaults to None.
+        name (str, optional): Prefix of the file name. Defaults to "bench".
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        Path: Path of the written file.
+    """
+    rng = np.random.default_rng(seed)
+    layers = PRODUCTS[product] if layers is None else layers
+    prefix = product.replace(".", "_")
+    n_rows = n_stations * n_dates
+
+    dat = {
+        "ID": np.repeat(stations(n_stations), n_dates),
+        "Latitude": 46.0,
+        "Longitude": -110.0,
+        "Date": np.tile(
+            pd.date_range("2000-01-01", periods=n_dates).strftime("%Y-%m-%d"),
+            n_stations,
+        ),
+    }
+    suffixes = [""] if hours is None else [f"_{h}" for h in range(hours)]
+    for suffix in suffixes:
+        for k, v in layers.items():
+            values = rng.uniform(v["ValidMin"], v["ValidMax"], n_rows)
+            r = rng.random(n_rows)
+            values[r < 0.05] = v["FillValue"]
+            values[(r >= 0.05) & (r < 0.07)] = v["ValidMax"] + 1
+            dat[f"{prefix}_{k}{suffix}"] = values
+
+    pth = Path(dirname) / f"{name}-{product.replace('.', '-')}-results.csv"
+    pd.DataFrame(dat).to_csv(pth, index=False)
+    return pth
+
+
+def cleaned_observations(n_rows: int, n_stations: int, seed: int = 0) -> pd.DataFrame:
+    """Build a synthetic frame in the format returned by clean_all, spread over MOD16A2 and MOD13A1.
+
+    Args:
+        n_rows (int): Number of observations.
+        n_stations (int): Number of stations.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: DataFrame with ID, Date, element, value, product and units columns.
+    """
+    rng = np.random.default_rng(seed)
+    series = [
+        (product, k, v["Units"])
+        for product, layers in PRODUCTS.items()
+        if not product.startswith("SPL4SMGP")
+        for k, v in layers.items()
+        if not v["IsQA"]
+    ]
+    # Every station has one observation of each element per day.
+    i = np.arange(n_rows)
+    per_day = n_stations * len(series)
+    which = np.array(series, dtype=object)[i % len(series)]
+    days = pd.to_timedelta(i // per_day, unit="D")
+    return pd.DataFrame(
+        {
+            "ID": np.array(stations(n_stations))[(i // len(series)) % n_stations],
+            "Date": pd.Timestamp("2000-01-01") + days,
+            "element": which[:, 1],
+            "value": rng.uniform(0, 1000, n_rows),
+            "product": which[:, 0],
+            "units": which[:, 2],
+        }
+    )
+
+
+def timed(fn: Callable, *args, repeat: int = 3, **kwargs) -> Tuple[float, Any]:
+    """Run fn repeat times and return the fastest wall time in seconds and the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, out
@@ -0,0 +1,76 @@
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+import pandas as pd
+from _common import PRODUCTS, seed_product_cache, write_appeears_csv
+from mt_mesonet_satellite import clean_all, iter_clean_all, to_db_format
+
+LABELS = ["ID", "element", "product", "units"]
+
+
+def clean_categorical(dirname: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """clean -> format with station, element, platform and units carried as categoricals."""
+    cleaned = clean_all(dirname)
+    return cleaned, to_db_format(cleaned, neo4j_pth=None, write=False)
+
+
+def clean_object(dirname: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """clean -> format with the label columns as repeated object strings, as before categoricals."""
+    cleaned = pd.concat(
+        [x.astype({k: object for k in LABELS}) for x in iter_clean_all(dirname)],
+        ignore_index=True,
+    )
+    return cleaned, to_db_format(cleaned, neo4j_pth=None, write=False)
+
+
+def peak_memory(fn: Callable, *args) -> Tuple[int, int]:
+    """Run fn under tracemalloc and return its peak traced memory and the size of the cleaned frame.
+
+    tracemalloc sees NumPy buffers and Python objects, but not memory allocated by Arrow (e.g. the
+    string columns of pandas >= 3), so both runs are measured with the label columns outside Arrow.
+    The frame size doesn't count the strings an object column points to, because rows share them.
+    """
+    tracemalloc.start()
+    cleaned, _ = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, int(cleaned.memory_usage(deep=False).sum())
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Compare peak memory of clean -> format with object label columns and with categoricals on a synthetic multi-station dataset."
+    )
+    parser.add_argument("--stations", type=int, default=100, help="Number of stations.")
+    parser.add_argument(
+        "--days", type=int, default=365, help="Days of observations per station."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        seed_product_cache(tmp / "cache", PRODUCTS)
+        dirname = tmp / "appeears"
+        dirname.mkdir()
+        for product in PRODUCTS:
+            hours = 8 if product.startswith("SPL4SMGP") else None
+            write_appeears_csv(dirname, product, args.stations, args.days, hours=hours)
+
+        results = {
+            name: peak_memory(fn, dirname)
+            for name, fn in [
+                ("object", clean_object),
+                ("categorical", clean_categorical),
+            ]
+        }
+
+    mib = 1024**2
+    for name, (peak, size) in results.items():
+        print(f"{name}: peak {peak / mib:.0f} MiB, cleaned frame {size / mib:.0f} MiB")
+    print(
+        f"Peak memory reduction: {results['object'][0] / results['categorical'][0]:.1f}x"
+    )
@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from _common import PRODUCTS, seed_product_cache, timed, write_appeears_csv
+from mt_mesonet_satellite import clean_all
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Time clean_all with different numbers of worker processes on a directory of synthetic AppEEARS files."
+    )
+    parser.add_argument(
+        "--files", type=int, default=8, help="Files of each product to write."
+    )
+    parser.add_argument("--stations", type=int, default=20, help="Stations per file.")
+    parser.add_argument(
+        "--days", type=int, default=1000, help="Days of observations per station."
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="Worker counts to time.",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=1, help="Runs of each worker count."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        seed_product_cache(tmp / "cache", PRODUCTS)
+        dirname = tmp / "appeears"
+        dirname.mkdir()
+        for i in range(args.files):
+            for product in PRODUCTS:
+                hours = 8 if product.startswith("SPL4SMGP") else None
+                write_appeears_csv(
+                    dirname,
+                    product,
+                    args.stations,
+                    args.days,
+                    hours=hours,
+                    name=f"bench{i}",
+                    seed=i,
+                )
+        n_files = len(list(dirname.glob("*.csv")))
+
+        results = {}
+        for workers in args.workers:
+            seconds, dat = timed(
+                clean_all, dirname, workers=workers, repeat=args.repeat
+            )
+            results[workers] = (seconds, dat)
+
+    baseline, expected = results[min(results)]
+    print(f"{n_files} files, {len(expected)} cleaned rows")
+    for workers, (seconds, dat) in results.items():
+        # Output order doesn't depend on the number of workers.
+        pd.testing.assert_frame_equal(dat, expected)
+        print(f"{workers} workers: {seconds:.2f}s ({baseline / seconds:.1f}x)")
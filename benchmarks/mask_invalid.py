@@ -0,0 +1,67 @@
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from _common import PRODUCTS, layer, seed_product_cache, timed, write_appeears_csv
+from mt_mesonet_satellite import Cleaner
+
+
+def mask_per_layer(cleaner: Cleaner, raw: pd.DataFrame) -> np.ndarray:
+    """The masking that _mask_invalid replaced: three boolean .loc assignments per layer."""
+    dat = raw[["ID", "Date"] + list(cleaner.layers.keys())].copy()
+    for k, v in cleaner.layers.items():
+        dat.loc[dat[k] > v.ValidMax, k] = np.nan
+        dat.loc[dat[k] < v.ValidMin, k] = np.nan
+        dat.loc[dat[k] == v.FillValue, k] = np.nan
+    return dat[list(cleaner.layers.keys())].to_numpy()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Compare Cleaner._mask_invalid against per-layer .loc masking on a synthetic wide sub-daily file."
+    )
+    parser.add_argument("--stations", type=int, default=50, help="Number of stations.")
+    parser.add_argument(
+        "--days", type=int, default=500, help="Days of observations per station."
+    )
+    parser.add_argument(
+        "--layers",
+        type=int,
+        default=8,
+        help="Synthetic layers added to the SPL4SMGP soil moisture layers.",
+    )
+    parser.add_argument(
+        "--hours", type=int, default=24, help="Observations of each layer per day."
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="Runs of each method, best is kept."
+    )
+    args = parser.parse_args()
+
+    layers = dict(PRODUCTS["SPL4SMGP.007"])
+    for i in range(args.layers):
+        extra = layer(f"Geophysical_Data_layer{i}", "unitless", 0, 1)
+        layers[extra["Layer"]] = extra
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        seed_product_cache(tmp / "cache", {"SPL4SMGP.007": layers})
+        f = write_appeears_csv(
+            tmp, "SPL4SMGP.007", args.stations, args.days, layers, hours=args.hours
+        )
+        cleaner = Cleaner(f, is_subdaily=True, chunksize=args.stations * args.days)
+        raw = next(cleaner.read())
+
+    n_values = raw.shape[0] * len(cleaner.layers)
+    print(f"{raw.shape[0]} rows x {len(cleaner.layers)} layer columns")
+
+    old, expected = timed(mask_per_layer, cleaner, raw, repeat=args.repeat)
+    new, values = timed(cleaner._mask_invalid, raw, repeat=args.repeat)
+    np.testing.assert_array_equal(values, expected)
+
+    print(f"per-layer .loc: {old:.3f}s ({n_values / old / 1e6:.1f}M values/s)")
+    print(f"_mask_invalid: {new:.3f}s ({n_values / new / 1e6:.1f}M values/s)")
+    print(f"Speedup: {old / new:.1f}x")
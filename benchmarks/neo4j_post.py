@@ -0,0 +1,90 @@
+import argparse
+import os
+import time
+
+from _common import cleaned_observations
+from dotenv import load_dotenv
+from mt_mesonet_satellite import MesonetSatelliteDB, to_db_format
+
+
+def post_per_row(db: MesonetSatelliteDB, dat):
+    """The write path that post replaced: one session and transaction per observation."""
+    for row in dat.to_dict("records"):
+        with db.driver.session() as session:
+            session.write_transaction(db._post_data, **row)
+
+
+def delete_benchmark_stations(db: MesonetSatelliteDB, prefix: str):
+    # CALL IN TRANSACTIONS only runs in auto-commit transactions, so session.run is used.
+    with db.driver.session() as session:
+        session.run(
+            "MATCH (s:Station)-[:OBSERVES]->(obs:Observation) WHERE s.name STARTS WITH $prefix "
+            "CALL { WITH obs DETACH DELETE obs } IN TRANSACTIONS OF 10000 ROWS",
+            prefix=prefix,
+        ).consume()
+        session.run(
+            "MATCH (s:Station) WHERE s.name STARTS WITH $prefix DETACH DELETE s",
+            prefix=prefix,
+        ).consume()
+
+
+def report(name: str, n_rows: int, seconds: float):
+    print(f"{name}: {n_rows} rows in {seconds:.1f}s ({n_rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Compare rows/second of MesonetSatelliteDB.post against one transaction per row. Writes synthetic 'bench' stations to the database and deletes them afterwards, so use a local database."
+    )
+    parser.add_argument(
+        "-e", "--env", type=str, default=".env", help="Path to your .env file."
+    )
+    parser.add_argument(
+        "-n", "--rows", type=int, default=1_000_000, help="Rows to write with post."
+    )
+    parser.add_argument(
+        "--per-row-rows",
+        type=int,
+        default=10_000,
+        help="Rows to write one at a time. The per-row path takes hours for the full frame, so its rate is measured on the first rows.",
+    )
+    parser.add_argument("--stations", type=int, default=50, help="Number of stations.")
+    parser.add_argument(
+        "-b", "--batch-size", type=int, default=5000, help="Rows per UNWIND batch."
+    )
+    args = parser.parse_args()
+    load_dotenv(args.env)
+
+    dat = to_db_format(
+        cleaned_observations(args.rows, args.stations), neo4j_pth=None, write=False
+    )
+    db = MesonetSatelliteDB(
+        uri=os.getenv("Neo4jURI"),
+        user=os.getenv("Neo4jUser"),
+        password=os.getenv("Neo4jPassword"),
+    )
+    try:
+        db.init_db_indices()
+        delete_benchmark_stations(db, "bench")
+
+        sample = dat.iloc[: args.per_row_rows]
+        start = time.perf_counter()
+        post_per_row(db, sample)
+        per_row = time.perf_counter() - start
+        report("per row", len(sample), per_row)
+        delete_benchmark_stations(db, "bench")
+
+        start = time.perf_counter()
+        db.post(dat, batch_size=args.batch_size)
+        batched = time.perf_counter() - start
+        report(f"post (batch_size={args.batch_size})", len(dat), batched)
+
+        per_row_rate = len(sample) / per_row
+        print(
+            f"Speedup: {len(dat) / batched / per_row_rate:.1f}x. The per-row path would take "
+            f"about {len(dat) / per_row_rate / 3600:.1f}h for {len(dat)} rows."
+        )
+    finally:
+        delete_benchmark_stations(db, "bench")
+        db.close()
@@ -0,0 +1,79 @@
+import argparse
+import os
+
+import pandas as pd
+from _common import cleaned_observations, stations, timed
+from dotenv import load_dotenv
+from mt_mesonet_satellite import MesonetSatelliteDB, to_db_format
+from neo4j_post import delete_benchmark_stations
+
+ELEMENTS = ["ET", "PET", "NDVI", "EVI"]
+
+
+def query_looped(db: MesonetSatelliteDB, names, elements, start_time, end_time):
+    """One query call, and so one round-trip, per station and element."""
+    dfs = [
+        db.query(station, start_time, end_time, element)
+        for station in names
+        for element in elements
+    ]
+    return pd.concat(dfs, ignore_index=True)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Compare MesonetSatelliteDB.query_many against one query call per station and element. Writes synthetic 'bench' stations to the database and deletes them afterwards, so use a local database."
+    )
+    parser.add_argument(
+        "-e", "--env", type=str, default=".env", help="Path to your .env file."
+    )
+    parser.add_argument("--stations", type=int, default=100, help="Number of stations.")
+    parser.add_argument(
+        "--days", type=int, default=365, help="Days of observations per station."
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="Runs of each query, best is kept."
+    )
+    args = parser.parse_args()
+    load_dotenv(args.env)
+
+    n_rows = args.stations * len(ELEMENTS) * args.days
+    dat = to_db_format(
+        cleaned_observations(n_rows, args.stations), neo4j_pth=None, write=False
+    )
+    start_time, end_time = int(dat["timestamp"].min()), int(dat["timestamp"].max())
+    names = stations(args.stations)
+
+    db = MesonetSatelliteDB(
+        uri=os.getenv("Neo4jURI"),
+        user=os.getenv("Neo4jUser"),
+        password=os.getenv("Neo4jPassword"),
+    )
+    try:
+        db.init_db_indices()
+        delete_benchmark_stations(db, "bench")
+        db.post(dat)
+
+        looped, looped_dat = timed(
+            query_looped,
+            db,
+            names,
+            ELEMENTS,
+            start_time,
+            end_time,
+            repeat=args.repeat,
+        )
+        many, many_dat = timed(
+            db.query_many, names, ELEMENTS, start_time, end_time, repeat=args.repeat
+        )
+        assert len(looped_dat) == len(many_dat) == len(dat)
+
+        print(
+            f"query: {len(names) * len(ELEMENTS)} round-trips, {looped:.2f}s for {len(looped_dat)} rows"
+        )
+        print(f"query_many: 1 round-trip, {many:.2f}s for {len(many_dat)} rows")
+        print(f"Speedup: {looped / many:.1f}x")
+    finally:
+        delete_benchmark_stations(db, "bench")
+        db.close()
@@ -0,0 +1,208 @@
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import httpx
+from loguru import logger
+
+from .Client import APPEEARS_URL
+from .Task import DownloadError
+
+# Statuses that are retried for idempotent requests. 429 and 503 with a Retry-After header are
+# retried for every request, because AppEEARS didn't process the request.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_AFTER_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "DELETE"}
+
+
+@dataclass
+class AsyncAppEEARSClient:
+    """Class that owns an asyncio HTTP client used to make many AppEEARS requests concurrently.
+
+    Requests share one connection pool, and at most max_concurrency requests (including file
+    downloads) are in flight at once. Retries follow the same rules as AppEEARSClient. Use it as an
+    async context manager, or call aclose when done:
+
+        async with AsyncAppEEARSClient() as client:
+            await asyncio.gather(*[task.status_update_async(token, client) for task in tasks])
+
+    Attributes:
+        base_url (str): URL of the AppEEARS API. Defaults to "https://appeears.earthdatacloud.nasa.gov/api".
+        max_concurrency (int): Maximum number of requests in flight at once. Defaults to 16.
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds. Defaults to (10, 300).
+        retries (int): Maximum number of retries per request. Defaults to 5.
+        backoff_factor (float): Retries wait backoff_factor * 2 ** (retry - 1) seconds. Defaults to 1.
+        chunk_size (int): Number of bytes to write at a time when downloading files. Defaults to 1 MiB.
+    """
+
+    base_url: str = APPEEARS_URL
+    max_concurrency: int = 16
+    timeout: Tuple[float, float] = (10, 300)
+    retries: int = 5
+    backoff_factor: float = 1
+    chunk_size: int = 1024 * 1024
+    client: httpx.AsyncClient = field(init=False, repr=False)
+    _semaphore: Optional[asyncio.Semaphore] = field(
+        default=None, init=False, repr=False
+    )
+
+    def __post_init__(self):
+        connect, read = self.timeout
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+            follow_redirects=True,
+        )
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the running event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close all pooled connections."""
+        await self.client.aclose()
+
+    def _retry_wait(
+        self, method: str, attempt: int, response: Optional[httpx.Response]
+    ) -> Optional[float]:
+        """Get the number of seconds to wait before retrying a request, or None if it shouldn't be retried.
+
+        Args:
+            method (str): HTTP method of the request.
+            attempt (int): Number of retries made so far.
+            response (Optional[httpx.Response]): The response, or None if the request failed to connect.
+
+        Returns:
+            Optional[float]: Seconds to wait, or None.
+        """
+        if attempt >= self.retries:
+            return None
+
+        retry_after = response.headers.get("Retry-After") if response else None
+        if response is not None:
+            if response.status_code in RETRY_AFTER_STATUSES and retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+            elif response.status_code not in RETRY_STATUSES:
+                return None
+
+        if method not in IDEMPOTENT_METHODS:
+            return None
+        return self.backoff_factor * 2**attempt
+
+    async def request(
+        self, method: str, path: str, token: Optional[str] = None, **kwargs
+    ) -> httpx.Response:
+        """Make a request to the AppEEARS API, retrying failures with exponential backoff.
+
+        Args:
+            method (str): HTTP method of the request.
+            path (str): Path of the endpoint relative to base_url, e.g. 'task'.
+            token (Optional[str], optional): Token from the Session object. If provided, it is sent as a bearer token. Defaults to None.
+            **kwargs: Additional arguments passed to httpx.AsyncClient.request.
+
+        Returns:
+            httpx.Response: The response.
+        """
+        headers = kwargs.pop("headers", {})
+        if token:
+            headers["Authorization"] = "Bearer {0}".format(token)
+
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with self.semaphore:
+                    response = await self.client.request(
+                        method, path, headers=headers, **kwargs
+                    )
+            except httpx.TransportError as e:
+                wait = self._retry_wait(method, attempt, None)
+                if wait is None:
+                    raise e
+            else:
+                wait = self._retry_wait(method, attempt, response)
+                if wait is None:
+                    return response
+
+            attempt += 1
+            logger.warning(f"Retrying {method} {path} in {wait} seconds.")
+            await asyncio.sleep(wait)
+
+    async def get(self, path: str, token: Optional[str] = None, **kwargs):
+        """Make a GET request to the AppEEARS API. See AsyncAppEEARSClient.request."""
+        return await self.request("GET", path, token, **kwargs)
+
+    async def post(self, path: str, token: Optional[str] = None, **kwargs):
+        """Make a POST request to the AppEEARS API. See AsyncAppEEARSClient.request."""
+        return await self.request("POST", path, token, **kwargs)
+
+    async def download(
+        self, path: str, dest: Union[str, Path], token: Optional[str] = None
+    ):
+        """Stream a file from the AppEEARS API to disk.
+
+        If dest already exists, only the rest of the file is requested with a Range header and
+        appended to it, so interrupted downloads resume where they left off.
+
+        Args:
+            path (str): Path of the file endpoint relative to base_url.
+            dest (Union[str, Path]): Path to write the file to.
+            token (Optional[str], optional): Token from the Session object. Defaults to None.
+
+        Raises:
+            DownloadError: Raised if the file can't be downloaded once the retries are used up.
+        """
+        dest = Path(dest)
+        attempt = 0
+        while True:
+            headers = {"Authorization": "Bearer {0}".format(token)} if token else {}
+            offset = dest.stat().st_size if dest.exists() else 0
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+            try:
+                async with self.semaphore:
+                    async with self.client.stream(
+                        "GET", path, headers=headers
+                    ) as response:
+                        # 416 means the file is already complete.
+                        if response.status_code == 416:
+                            return
+                        wait = self._retry_wait("GET", attempt, response)
+                        if wait is None:
+                            if response.is_error:
+                                raise DownloadError(
+                                    f"The download of {path} failed with status {response.status_code}."
+                                )
+                            # Start over if the server ignored the Range header.
+                            mode = "ab" if response.status_code == 206 else "wb"
+                            with open(dest, mode) as con:
+                                async for data in response.aiter_bytes(
+                                    self.chunk_size
+                                ):
+                                    con.write(data)
+                            return
+            except httpx.TransportError as e:
+                wait = self._retry_wait("GET", attempt, None)
+                if wait is None:
+                    raise DownloadError(f"The download of {path} failed ({e}).")
+
+            attempt += 1
+            logger.warning(f"Retrying download of {path} in {wait} seconds.")
+            await asyncio.sleep(wait)
@@ -1,32 +1,43 @@
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-import janitor
 import numpy as np
 import pandas as pd
 from loguru import logger
 
 from .Product import Layer, Product
+from .Vocabulary import VOCABULARY, Vocabulary
 
 
 @dataclass
 class Cleaner:
     """Class to clean .csv returned by AppEEARS API
 
+    Only the header of the .csv is read when a Cleaner is created. The ID, Date and layer columns
+    are then read in chunks when the data are cleaned, so memory use doesn't grow with file size.
+
     Attributes:
         f (Union[str, Path]): Path to the .csv file to clean.
         is_subdaily (bool): Whether or not the product has sub-daily observations.
+        to_daily (bool): Whether or not to aggregate sub-daily observations to daily means. If False, each observation is timestamped at its hour and its element is suffixed with the interval between observations (e.g. 'Geophysical_Data_sm_surface_3h'). Defaults to True.
+        chunksize (int): Number of rows of the .csv to read and clean at a time. Defaults to 100000.
         product (str): The product name. Derived from the filename.
-        raw (pd.DataFrame): The raw data from the .csv. Derived from the filename.
+        columns (Dict[str, str]): Mapping of cleaned column names to the column names in the .csv. Derived from the file header.
         meta (Product): Product object providing metadata. Derived from filename.
         layers (Dict[str, Layer]): Dict of layer objects associated with a product. Derived from filename.
+        vocab (Vocabulary): Vocabulary used to encode the ID, element, product and units columns as categoricals. Defaults to the vocabulary shared by the whole pipeline.
     """
 
     f: Union[str, Path]
     is_subdaily: bool = False
+    to_daily: bool = True
+    chunksize: int = 100000
+    vocab: Vocabulary = field(default_factory=lambda: VOCABULARY, repr=False)
     product: str = field(init=False)
-    raw: pd.DataFrame = field(init=False)
+    columns: Dict[str, str] = field(init=False)
     meta: Product = field(init=False)
     layers: Dict[str, Layer] = field(init=False)
 
@@ -34,115 +45,284 @@ class Cleaner:
         self.f = self.f if isinstance(self.f, Path) else Path(self.f)
         parts = self.f.stem.split("-")
         self.product = f"{parts[-3]}.{parts[-2]}"
-        self.raw = pd.read_csv(self.f)
-        self.raw.columns = self.raw.columns.str.replace(f"{parts[-3]}_{parts[-2]}_", "")
+        header = pd.read_csv(self.f, nrows=0).columns
+        self.columns = {
+            k: v
+            for k, v in zip(
+                header.str.replace(f"{parts[-3]}_{parts[-2]}_", ""), header
+            )
+        }
         self.meta = Product(self.product)
         self.layers = {
-            k: v for k, v in self.meta.layers.items() if k in self.raw.columns
+            k: v for k, v in self.meta.layers.items() if k in self.columns
         }
         if self.is_subdaily:
             tmp = {}
             for k, v in self.meta.layers.items():
                 for hour in range(0, 24):
-                    if f"{k}_{hour}" in self.raw.columns:
+                    if f"{k}_{hour}" in self.columns:
                         tmp[f"{k}_{hour}"] = v
             self.layers.update(tmp)
 
         self.layers = {k: v for k, v in self.layers.items() if not v.IsQA}
 
+    def read(self) -> Iterator[pd.DataFrame]:
+        """Read the ID, Date and layer columns of the .csv in chunks.
+
+        Yields:
+            Iterator[pd.DataFrame]: Chunks of the raw data with cleaned column names.
+        """
+        keep = ["ID", "Date"] + list(self.layers.keys())
+        dtype = {self.columns[k]: np.float64 for k in self.layers}
+        dtype.update({self.columns["ID"]: "category", self.columns["Date"]: str})
+        rename = {self.columns[k]: k for k in keep}
+
+        reader = pd.read_csv(
+            self.f,
+            usecols=[self.columns[k] for k in keep],
+            dtype=dtype,
+            chunksize=self.chunksize,
+        )
+        for chunk in reader:
+            yield chunk.rename(columns=rename)[keep]
+
+    def iter_clean(self) -> Iterator[pd.DataFrame]:
+        """Removes invalid data and fills with NA. Pivots from wide to long format one chunk at a time.
+
+        Yields:
+            Iterator[pd.DataFrame]: DataFrames of cleaned data.
+        """
+        logger.info("Cleaning {f}", f=self.f)
+        unit_map = {k: v.Units for k, v in self.layers.items()}
+
+        for raw in self.read():
+            values = self._mask_invalid(raw)
+
+            if self.is_subdaily:
+                dat = self._clean_subdaily(raw, values)
+            else:
+                dat = self._melt(raw, values, list(self.layers.keys()))
+
+            dat = dat.assign(
+                product=pd.Categorical.from_codes(
+                    np.zeros(len(dat), dtype=np.int8), categories=[self.product]
+                )
+            )
+
+            # Look up units once per distinct element and expand them with the element codes.
+            # Elements without a matching layer keep their element name as their units.
+            element = dat["element"].astype("category")
+            categories = element.cat.categories
+            units = pd.Categorical(
+                [unit_map.get(e, e) for e in categories]
+            ).take(element.cat.codes.to_numpy())
+            dat = dat.assign(units=units)
+
+            yield self.vocab.encode(dat)
+
     def clean(self) -> pd.DataFrame:
         """Removes invalid data and fills with NA. Pivots from wide to long format.
 
         Returns:
             pd.DataFrame: DataFrame of cleaned data.
         """
-        logger.info("Cleaning {f}", f=self.f)
-        dat = self.raw[["ID", "Date"] + list(self.layers.keys())]
+        return self.vocab.concat(self.iter_clean())
 
-        for k, v in self.layers.items():
-            dat.loc[dat[k] > v.ValidMax, k] = np.nan
-            dat.loc[dat[k] < v.ValidMin, k] = np.nan
-            dat.loc[dat[k] == v.FillValue, k] = np.nan
+    def _mask_invalid(self, raw: pd.DataFrame) -> np.ndarray:
+        """Replace values outside of each layer's valid range or equal to its fill value with NA.
 
-        dat = dat.pivot_longer(index=["ID", "Date"], names_to="element")
+        The ValidMin, ValidMax and FillValue of every layer are aligned to the layer columns so that
+        the whole block of values is masked with a single broadcasted comparison.
 
-        if self.is_subdaily:
-            dat = self._clean_subdaily(dat)
+        Args:
+            raw (pd.DataFrame): Raw data with ID, Date and layer columns.
 
-        dat = dat.assign(product=self.product)
+        Returns:
+            np.ndarray: 2-D array of masked layer values with one column per layer.
+        """
+        cols = list(self.layers.keys())
+        values = raw[cols].to_numpy(dtype=np.float64, copy=True)
 
-        unit_map = {k: v.Units for k, v in self.layers.items()}
-        dat = dat.assign(units=dat["element"])
-        dat = dat.replace({"units": unit_map})
+        valid_min = np.array([v.ValidMin for v in self.layers.values()], dtype=np.float64)
+        valid_max = np.array([v.ValidMax for v in self.layers.values()], dtype=np.float64)
+        fill = np.array([v.FillValue for v in self.layers.values()], dtype=np.float64)
 
-        return dat
+        invalid = (values > valid_max) | (values < valid_min) | (values == fill)
+        values[invalid] = np.nan
+
+        return values
 
     @staticmethod
-    def _clean_subdaily(dat: pd.DataFrame, to_daily: bool = True) -> pd.DataFrame:
-        """Cleans subdaily data as they are formatted rather strangely by AppEEARS. Can optionally aggregate to daily means.
+    def _melt(raw: pd.DataFrame, values: np.ndarray, elements: List[str]) -> pd.DataFrame:
+        """Pivot a block of layer values from wide to long format.
+
+        Rows are ordered layer by layer (the block is raveled in Fortran order), with ID and Date
+        tiled once per layer and element stored as a categorical.
 
         Args:
-            dat (pd.DataFrame): DataFrame of sub-daily AppEEARS data.
-            to_daily (bool, optional): Wheteher or not to aggregate the data to a daily mean. Defaults to True.
+            raw (pd.DataFrame): Raw data with ID and Date columns.
+            values (np.ndarray): 2-D array of layer values with one column per layer.
+            elements (List[str]): The element name of each column of values.
+
+        Returns:
+            pd.DataFrame: Long format DataFrame with ID, Date, element and value columns.
+        """
+        n_rows, n_layers = values.shape
+        codes = np.repeat(np.arange(n_layers, dtype=np.int32), n_rows)
+        return pd.DataFrame(
+            {
+                "ID": pd.Categorical.from_codes(
+                    np.tile(raw["ID"].cat.codes.to_numpy(), n_layers),
+                    categories=raw["ID"].cat.categories,
+                ),
+                "Date": np.tile(raw["Date"].to_numpy(), n_layers),
+                "element": pd.Categorical.from_codes(codes, categories=elements),
+                "value": values.ravel(order="F"),
+            }
+        )
+
+    def _split_subdaily(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Split the sub-daily layer column names (e.g. 'Geophysical_Data_sm_surface_3') into element and hour.
+
+        Each distinct column name is only parsed once, and every column is mapped to the integer
+        code of its element.
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray]: The distinct element names, the element code of each layer column and the hour of each layer column.
+        """
+        elements = {}
+        codes = []
+        hours = []
+        for k in self.layers.keys():
+            element, hour = k.rsplit("_", 1)
+            codes.append(elements.setdefault(element, len(elements)))
+            hours.append(hour)
+
+        return list(elements), np.array(codes), np.array(hours, dtype=object)
+
+    def _clean_subdaily(self, raw: pd.DataFrame, values: np.ndarray) -> pd.DataFrame:
+        """Cleans subdaily data as they are formatted rather strangely by AppEEARS. Aggregates to daily means if to_daily is True.
+
+        Args:
+            raw (pd.DataFrame): Raw sub-daily AppEEARS data with ID and Date columns.
+            values (np.ndarray): 2-D array of masked layer values with one column per layer.
 
         Returns:
             pd.DataFrame: Cleaned sub-daily dataframe.
         """
-        dat = dat.assign(spl=dat.element.str.split("_"))
-        dat = dat.assign(hour=dat.spl.str[-1])
-        dat = dat.assign(element=dat.spl.str[:-1].str.join("_"))
-        dat = dat.drop(columns="spl")
-
-        if to_daily:
-            dat = (
-                dat.groupby_agg(
-                    by=["ID", "Date", "element"],
-                    agg="mean",
-                    agg_column_name="value",
-                    new_column_name="value",
-                    dropna=True,
-                )
-                .drop(columns="hour")
-                .drop_duplicates()
-                .reset_index(drop=True)
-            )
-            return dat
+        elements, codes, hours = self._split_subdaily()
 
-        hours = set([int(x) for x in dat.hour.to_list()])
-        hours = int(24 / len(hours))
-        dat = dat.assign(hour=dat.hour * hours)
-        dat = dat.deconcatenate_column(
-            "Date", "-", new_column_names=["year", "month", "day"]
-        )
+        if self.to_daily:
+            # Average each element's hourly columns in wide format before melting. The one-hot
+            # matrix sums the non-missing values and counts of every element in one product.
+            onehot = (codes[:, None] == np.arange(len(elements))).astype(np.float64)
+            present = ~np.isnan(values)
+            sums = np.where(present, values, 0) @ onehot
+            counts = present.astype(np.float64) @ onehot
+            with np.errstate(invalid="ignore", divide="ignore"):
+                daily = sums / counts
+            return self._melt(raw, daily, elements)
+
+        # Keep the native sub-daily resolution. The column suffixes index the observations
+        # within a day, so they are converted to hour offsets from midnight.
+        hours = hours.astype(np.int64)
+        step = 24 // len(set(hours))
+        offsets = (hours * step).astype("timedelta64[h]")
+        dates = pd.to_datetime(raw["Date"]).to_numpy(dtype="datetime64[ns]")
+
+        # The first observation of a day shares its timestamp with the daily mean, so native
+        # elements are named after their interval to keep their keys and series separate.
+        dat = self._melt(raw, values, list(self.layers.keys()))
         dat = dat.assign(
-            Date=pd.to_datetime(
-                dict(year=dat.year, month=dat.month, day=dat.day, hour=dat.hour)
-            )
+            Date=(dates[None, :] + offsets[:, None]).ravel(),
+            element=pd.Categorical.from_codes(
+                codes[dat["element"].cat.codes.to_numpy()],
+                categories=[f"{x}_{step}h" for x in elements],
+            ),
         )
-        dat = dat.drop(columns=["hour", "year", "month", "day"])
         return dat
 
 
+def _clean_file(f: Path, to_daily: bool = True) -> pd.DataFrame:
+    """Clean a single AppEEARS .csv file. Used by clean_all to fan files out to worker processes.
+
+    Args:
+        f (Path): Path to the .csv file to clean.
+        to_daily (bool, optional): Whether or not to aggregate sub-daily observations to daily means. Defaults to True.
+
+    Returns:
+        pd.DataFrame: DataFrame of cleaned data.
+    """
+    subdaily = "SPL4SMGP" in f.stem
+    return Cleaner(f, is_subdaily=subdaily, to_daily=to_daily).clean()
+
+
 def clean_all(
-    dirname: Union[str, Path], save: Optional[Union[str, Path]] = None
+    dirname: Union[str, Path],
+    save: Optional[Union[str, Path]] = None,
+    workers: int = 1,
+    to_daily: bool = True,
 ) -> pd.DataFrame:
     """Clean all of the AppEEARS .csv files in a directory and combine them into a single dataframe.
 
     Args:
         dirname (Union[str, Path]): Directory containing the files to clean.
         save (Optional[Union[str, Path]], optional): Pathname to save file to. If left as none, the file is not saved, but the dataframe is returned. Defaults to None.
+        workers (int, optional): Number of processes to clean files with. Files are combined in filename order regardless of the number of workers. Defaults to 1.
+        to_daily (bool, optional): Whether or not to aggregate sub-daily observations to daily means. Defaults to True.
 
     Returns:
         pd.DataFrame: DataFrame of combined and cleaned data.
     """
     dirname = dirname if isinstance(dirname, Path) else Path(dirname)
-    dfs = []
-    for f in dirname.iterdir():
-        subdaily = "SPL4SMGP" in f.stem
-        c = Cleaner(f, is_subdaily=subdaily)
-        tmp = c.clean()
-        dfs.append(tmp)
-    dat = pd.concat(dfs, axis=0)
+    files = sorted(dirname.glob("*.csv"))
+    clean_file = partial(_clean_file, to_daily=to_daily)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            dfs = list(executor.map(clean_file, files))
+    else:
+        dfs = [clean_file(f) for f in files]
+    # Each worker process has its own vocabulary, so recode the results to the shared one.
+    dat = VOCABULARY.concat(dfs)
     if save:
         dat.to_csv(save, index=False)
     return dat
+
+
+def iter_clean_all(
+    dirname: Union[str, Path], chunksize: int = 100000, to_daily: bool = True
+) -> Iterator[pd.DataFrame]:
+    """Clean all of the AppEEARS .csv files in a directory, yielding the cleaned data in chunks.
+
+    Args:
+        dirname (Union[str, Path]): Directory containing the files to clean.
+        chunksize (int, optional): Number of rows of each .csv to read and clean at a time. Defaults to 100000.
+        to_daily (bool, optional): Whether or not to aggregate sub-daily observations to daily means. Defaults to True.
+
+    Yields:
+        Iterator[pd.DataFrame]: DataFrames of cleaned data.
+    """
+    dirname = dirname if isinstance(dirname, Path) else Path(dirname)
+    yield from iter_clean_files(
+        sorted(dirname.glob("*.csv")), chunksize=chunksize, to_daily=to_daily
+    )
+
+
+def iter_clean_files(
+    files: Iterable[Union[str, Path]], chunksize: int = 100000, to_daily: bool = True
+) -> Iterator[pd.DataFrame]:
+    """Clean AppEEARS .csv files one after another, yielding the cleaned data in chunks.
+
+    Args:
+        files (Iterable[Union[str, Path]]): The .csv files to clean.
+        chunksize (int, optional): Number of rows of each .csv to read and clean at a time. Defaults to 100000.
+        to_daily (bool, optional): Whether or not to aggregate sub-daily observations to daily means. Defaults to True.
+
+    Yields:
+        Iterator[pd.DataFrame]: DataFrames of cleaned data.
+    """
+    for f in files:
+        f = Path(f)
+        subdaily = "SPL4SMGP" in f.stem
+        c = Cleaner(f, is_subdaily=subdaily, to_daily=to_daily, chunksize=chunksize)
+        yield from c.iter_clean()
@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+APPEEARS_URL = "https://appeears.earthdatacloud.nasa.gov/api"
+
+
+class _AppEEARSRetry(Retry):
+    """Retry policy that also retries non-idempotent requests answered with a 429 or 503 and a Retry-After header.
+
+    urllib3 checks allowed_methods before anything else, so without this a POST is never retried.
+    """
+
+    RETRY_AFTER_STATUS_CODES = frozenset([429, 503])
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if (
+            self.total
+            and self.respect_retry_after_header
+            and has_retry_after
+            and status_code in self.RETRY_AFTER_STATUS_CODES
+        ):
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+@dataclass
+class AppEEARSClient:
+    """Class that owns a pooled HTTP session used for every request to the AppEEARS API.
+
+    Connections are kept alive and reused across requests, so polling and downloading don't pay
+    for a new TCP and TLS handshake each time. Failed requests are retried with exponential backoff.
+    Connection errors and 429, 500, 502, 503 and 504 responses are retried for GET and DELETE
+    requests. Other requests are only retried when AppEEARS sends a 429 or 503 with a Retry-After
+    header, which means the request wasn't processed. Retry-After is always honored.
+
+    Attributes:
+        base_url (str): URL of the AppEEARS API. Defaults to "https://appeears.earthdatacloud.nasa.gov/api".
+        pool_size (int): Maximum number of connections kept open to AppEEARS. Defaults to 10.
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds. Defaults to (10, 300).
+        retries (int): Maximum number of retries per request. Defaults to 5.
+        backoff_factor (float): Retries wait backoff_factor * 2 ** (retry - 1) seconds. Defaults to 1.
+        session (requests.Session): The pooled session.
+    """
+
+    base_url: str = APPEEARS_URL
+    pool_size: int = 10
+    timeout: Tuple[float, float] = (10, 300)
+    retries: int = 5
+    backoff_factor: float = 1
+    session: requests.Session = field(init=False, repr=False)
+
+    def __post_init__(self):
+        retry = _AppEEARSRetry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(["GET", "HEAD", "DELETE"]),
+            respect_retry_after_header=True,
+            # Hand the final response back so callers can inspect the status code.
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(
+        self, method: str, path: str, token: Optional[str] = None, **kwargs
+    ) -> requests.Response:
+        """Make a request to the AppEEARS API.
+
+        Args:
+            method (str): HTTP method of the request.
+            path (str): Path of the endpoint relative to base_url, e.g. 'task'.
+            token (Optional[str], optional): Token from the Session object. If provided, it is sent as a bearer token. Defaults to None.
+            **kwargs: Additional arguments passed to requests.Session.request.
+
+        Returns:
+            requests.Response: The response.
+        """
+        headers = kwargs.pop("headers", {})
+        if token:
+            headers["Authorization"] = "Bearer {0}".format(token)
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(
+            method, f"{self.base_url}/{path}", headers=headers, **kwargs
+        )
+
+    def get(self, path: str, token: Optional[str] = None, **kwargs):
+        """Make a GET request to the AppEEARS API. See AppEEARSClient.request."""
+        return self.request("GET", path, token, **kwargs)
+
+    def post(self, path: str, token: Optional[str] = None, **kwargs):
+        """Make a POST request to the AppEEARS API. See AppEEARSClient.request."""
+        return self.request("POST", path, token, **kwargs)
+
+    def delete(self, path: str, token: Optional[str] = None, **kwargs):
+        """Make a DELETE request to the AppEEARS API. See AppEEARSClient.request."""
+        return self.request("DELETE", path, token, **kwargs)
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+
+CLIENT = AppEEARSClient()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Union
+
+import numpy as np
+from loguru import logger
+
+
+@dataclass
+class KeyIndex:
+    """Class to keep a sorted on-disk index of the observation keys that have already been stored.
+
+    The keys are saved as a sorted .npy array that is memory mapped rather than loaded, so checking
+    a batch of keys only reads the pages touched by a binary search. This lets a re-run of a
+    partially failed update skip observations that are already stored without querying the database.
+
+    Added keys are buffered in memory as a few sorted segments and merged into the file by flush,
+    so the file is rewritten once per update rather than once per posted chunk. The buffer is also
+    flushed when it grows as large as the file (or flush_size), which keeps the total work of a
+    long backfill linear in the number of keys. Keys that are lost before a flush only mean those
+    observations are posted again, which the observation stores skip.
+
+    The index is safe to use from several threads, e.g. checked by the format stage of an
+    IngestPipeline while the write stage adds keys.
+
+    Attributes:
+        path (Union[str, Path]): Path of the .npy file holding the index.
+        flush_size (int): Minimum number of buffered keys that triggers a flush. Defaults to 10_000_000.
+        keys (np.ndarray): Sorted array of stored observation keys that have been flushed.
+    """
+
+    path: Union[str, Path]
+    flush_size: int = 10_000_000
+    keys: np.ndarray = field(init=False, repr=False)
+    _pending: List[np.ndarray] = field(default_factory=list, init=False, repr=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        self.path = Path(self.path)
+        self._load()
+
+    def _load(self):
+        if self.path.exists():
+            self.keys = np.load(self.path, mmap_mode="r")
+        else:
+            self.keys = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.keys) + sum(len(segment) for segment in self._pending)
+
+    @staticmethod
+    def _search(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        if len(sorted_keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+
+        idx = np.searchsorted(sorted_keys, keys)
+        idx = np.minimum(idx, len(sorted_keys) - 1)
+        return np.asarray(sorted_keys[idx]) == keys
+
+    def contains(self, keys: Iterable[int]) -> np.ndarray:
+        """Check which keys are already in the index.
+
+        Args:
+            keys (Iterable[int]): Observation keys to check.
+
+        Returns:
+            np.ndarray: Boolean array that is True where a key is in the index.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        with self._lock:
+            return self._contains(keys)
+
+    def _contains(self, keys: np.ndarray) -> np.ndarray:
+        found = self._search(self.keys, keys)
+        for segment in self._pending:
+            found |= self._search(segment, keys)
+        return found
+
+    def add(self, keys: Iterable[int]):
+        """Add keys to the index. They are saved to disk by the next flush.
+
+        Args:
+            keys (Iterable[int]): Observation keys to add.
+        """
+        keys = np.unique(np.asarray(keys, dtype=np.int64))
+        with self._lock:
+            keys = keys[~self._contains(keys)]
+            if len(keys) == 0:
+                return
+
+            # Merge the newest segments while they are at least as large as the one before, so
+            # there are only ever a logarithmic number of segments to search.
+            self._pending.append(keys)
+            while len(self._pending) > 1 and len(self._pending[-1]) >= len(
+                self._pending[-2]
+            ):
+                newest = self._pending.pop()
+                merged = np.concatenate([self._pending.pop(), newest])
+                merged.sort()
+                self._pending.append(merged)
+
+            n_pending = sum(len(segment) for segment in self._pending)
+            if n_pending >= max(self.flush_size, len(self.keys)):
+                self._flush()
+
+    def flush(self):
+        """Merge the buffered keys into the index file."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        merged = np.concatenate([self.keys, *self._pending])
+        merged.sort()
+
+        # Write to a temporary file and rename it so an interruption can't corrupt the index.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as con:
+            np.save(con, merged)
+        os.replace(tmp, self.path)
+        n_added = len(merged) - len(self.keys)
+        self._load()
+        self._pending = []
+        logger.info(f"Added {n_added} keys to the observation key index.")
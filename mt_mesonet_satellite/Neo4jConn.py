@@ -1,44 +1,296 @@
+import os
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import Union
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
 
+import numpy as np
 import pandas as pd
 from loguru import logger
 from neo4j.exceptions import ConstraintError
 
 from neo4j import GraphDatabase
 
+from .to_db_format import observation_key
+
+# Column names and dtypes of the records returned by the read queries.
+QUERY_COLUMNS = {
+    "station": "category",
+    "date": "int64",
+    "platform": "category",
+    "element": "category",
+    "value": "float64",
+    "units": "category",
+}
+LATEST_COLUMNS = {"date": "int64", "platform": "category", "element": "category"}
+
+# The canned read queries. These are also PROFILEd by MesonetSatelliteDB.profile_queries.
+QUERIES = {
+    "query": (
+        "MATCH p = (obs:Observation)<-[o:OBSERVES]-(s:Station) "
+        "WHERE o.timestamp >= $start_time and o.timestamp <= $end_time and s.name = $station and obs.element = $element "
+        "RETURN s.name, o.timestamp, obs.platform,  obs.element, obs.value, obs.units"
+    ),
+    "query_many": (
+        "MATCH p = (obs:Observation)<-[o:OBSERVES]-(s:Station) "
+        "WHERE o.timestamp >= $start_time and o.timestamp <= $end_time and s.name IN $stations and obs.element IN $elements "
+        "RETURN s.name, o.timestamp, obs.platform,  obs.element, obs.value, obs.units"
+    ),
+    "get_latest": (
+        "MATCH (s:Station)-[o:OBSERVES]->(obs:Observation) "
+        "RETURN MAX(o.timestamp) as time, obs.platform as platform, obs.element as element "
+        "ORDER BY time"
+    ),
+}
+
+# Constraints and indices created by MesonetSatelliteDB.init_db_indices, keyed by name. The
+# station lookup is served by the unique constraint, the time range by a relationship property
+# index on OBSERVES and the element filter by a node index. Neo4j can't build one index across
+# node and relationship properties, so these are combined by the planner.
+INDEXES = {
+    "stationConstraint": "CREATE CONSTRAINT stationConstraint IF NOT EXISTS FOR (s:Station) REQUIRE s.name IS UNIQUE",
+    "obsIdConstraint": "CREATE CONSTRAINT obsIdConstraint IF NOT EXISTS FOR (obs:Observation) REQUIRE obs.id IS UNIQUE",
+    "observesTimestampIndex": "CREATE INDEX observesTimestampIndex IF NOT EXISTS FOR ()-[o:OBSERVES]-() ON (o.timestamp)",
+    "observationElementIndex": "CREATE INDEX observationElementIndex IF NOT EXISTS FOR (obs:Observation) ON (obs.element)",
+}
+
+# Indices created by earlier versions that are dropped by init_db_indices. timestampIndex was
+# created on a node label called OBSERVES, so it never indexed the relationships.
+LEGACY_INDEXES = ["timestampIndex"]
+
+
+def _stream_to_frame(
+    result: Iterable, columns: Dict[str, str], fetch_size: int
+) -> pd.DataFrame:
+    """Consume a Neo4j result record by record into typed NumPy columns.
+
+    Records are written into preallocated arrays of length fetch_size, so no intermediate
+    list of rows is built. Numeric columns are stored as int64 or float64 and string columns
+    are stored as integer codes that are converted into pandas categoricals at the end.
+
+    Args:
+        result (Iterable): A Neo4j result. Each record must have one value per column.
+        columns (Dict[str, str]): Mapping of column name to dtype ('int64', 'float64' or 'category').
+        fetch_size (int): Number of records to allocate space for at a time.
+
+    Returns:
+        pd.DataFrame: DataFrame of the results.
+    """
+    names = list(columns)
+    dtypes = [np.int32 if t == "category" else t for t in columns.values()]
+    vocabs = [{} if t == "category" else None for t in columns.values()]
+
+    def allocate():
+        return [np.empty(fetch_size, dtype=t) for t in dtypes]
+
+    chunks = []
+    buffers = allocate()
+    n = 0
+    for record in result:
+        if n == fetch_size:
+            chunks.append(buffers)
+            buffers = allocate()
+            n = 0
+        for i, v in enumerate(record.values()):
+            vocab = vocabs[i]
+            if vocab is not None:
+                v = "" if v is None else v
+                buffers[i][n] = vocab.setdefault(v, len(vocab))
+            elif v is None:
+                buffers[i][n] = np.nan
+            else:
+                buffers[i][n] = v
+        n += 1
+    chunks.append([b[:n] for b in buffers])
+
+    out = {}
+    for i, name in enumerate(names):
+        values = np.concatenate([c[i] for c in chunks])
+        if vocabs[i] is not None:
+            values = pd.Categorical.from_codes(values, categories=list(vocabs[i]))
+        out[name] = values
+
+    return pd.DataFrame(out)
+
 
 class MesonetSatelliteDB:
-    def __init__(self, uri: str, user: str, password: str) -> None:
+    def __init__(
+        self, uri: str, user: str, password: str, fetch_size: int = 10000
+    ) -> None:
         """Initialize Mesonet Satellite DB object and connect to the Neo4j db.
 
         Args:
             uri (str): The database URI for the Neo4j database.
             user (str): The database Neo4j username.
             password (str): The database Neo4j password.
+            fetch_size (int, optional): Number of records to pull from the server at a time when reading. Defaults to 10000.
         """
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.fetch_size = fetch_size
 
     def close(self):
         """Close the connection to the Neo4j database."""
         self.driver.close()
 
-    def init_db_indices(self):
-        """Initialize index relationships and unique constraints."""
+    def init_db_indices(
+        self, profile: bool = False, timeout: int = 600
+    ) -> Optional[pd.DataFrame]:
+        """Initialize the indices and unique constraints in INDEXES and drop the ones in LEGACY_INDEXES.
+
+        Every statement uses IF EXISTS or IF NOT EXISTS, so this can be re-run safely. The method
+        waits for new indices to finish populating before returning.
+
+        Args:
+            profile (bool, optional): PROFILE the canned queries before and after creating the indices. Defaults to False.
+            timeout (int, optional): Seconds to wait for the indices to come online. Defaults to 600.
+
+        Returns:
+            Optional[pd.DataFrame]: If profile is True, the db hits and rows of each canned query before and after.
+        """
+        if profile:
+            before = self.profile_queries()
+
         with self.driver.session() as session:
             session.write_transaction(self._init_index)
+            session.run("CALL db.awaitIndexes($timeout)", timeout=timeout).consume()
+        logger.info(f"Initialized {len(INDEXES)} indices and constraints.")
+
+        if not profile:
+            return None
+
+        out = before.merge(
+            self.profile_queries(), on="query", suffixes=("_before", "_after")
+        )
+        for row in out.itertuples():
+            logger.info(
+                f"{row.query}: {row.db_hits_before} -> {row.db_hits_after} db hits."
+            )
+        return out
+
+    def profile_queries(
+        self,
+        station: Optional[str] = None,
+        element: str = "NDVI",
+        start_time: int = 0,
+        end_time: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """PROFILE each of the canned queries in QUERIES and count the database hits.
+
+        Args:
+            station (Optional[str], optional): Station to query. If None, the first station in the database is used. Defaults to None.
+            element (str, optional): Element to query. Defaults to "NDVI".
+            start_time (int, optional): The start time of the query formatted as seconds since 1970-01-01. Defaults to 0.
+            end_time (Optional[int], optional): The end time of the query formatted as seconds since 1970-01-01. If None, the current time is used. Defaults to None.
+
+        Returns:
+            pd.DataFrame: DataFrame with query, db_hits and rows columns.
+        """
+        with self.driver.session() as session:
+            if station is None:
+                stations = session.read_transaction(self._get_stations)
+                station = stations[0] if stations else ""
+            params = {
+                "station": station,
+                "stations": [station],
+                "element": element,
+                "elements": [element],
+                "start_time": start_time,
+                "end_time": end_time or int(pd.Timestamp.now(tz="UTC").timestamp()),
+            }
+            out = []
+            for name, query in QUERIES.items():
+                profile = session.read_transaction(self._profile, query, params)
+                out.append({"query": name, **profile})
+
+        return pd.DataFrame(out, columns=["query", "db_hits", "rows"])
 
-    def init_db(self, f_dir: Union[str, Path], use_path: bool = False):
+    def init_db(
+        self,
+        f_dir: Union[str, Path],
+        use_path: bool = False,
+        batch_size: int = 10000,
+        workers: Optional[int] = None,
+    ):
         """Initialize the Neo4j database using satellite data derived from the to_db_format.py script.
 
+        Each file is loaded with LOAD CSV inside CALL { ... } IN TRANSACTIONS, so the server commits
+        every batch_size rows and memory on the server stays bounded however large the file is.
+        Files are loaded concurrently, one per worker. Files written by to_db_format with split=True
+        never share a station, so concurrent loads don't contend for the same Station nodes.
+
         Args:
             f_dir (Union[str, Path]): The directory with the 'data_init' files to save to the database.
+            use_path (bool, optional): Load files by their full path rather than relative to the Neo4j import directory. Defaults to False.
+            batch_size (int, optional): Number of rows to commit per transaction. Defaults to 10000.
+            workers (Optional[int], optional): Number of files to load at once. If None, one per file up to the number of CPUs. Defaults to None.
+        """
+        files = sorted(Path(f_dir).glob("data_init*"))
+        if not files:
+            logger.warning(f"No 'data_init' files found in {f_dir}.")
+            return
+
+        paths = [str(f) if use_path else f"file:///{f.name}" for f in files]
+        workers = workers or min(len(paths), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._load_file, f_path, batch_size): f_path
+                for f_path in paths
+            }
+            for f in as_completed(futures):
+                f.result()
+                logger.info(f"Loaded {futures[f]} into the database.")
+
+    def _load_file(self, f_path: str, batch_size: int):
+        """Load a single 'data_init' file in its own session. Used by init_db.
+
+        Args:
+            f_path (str): Path or file:/// URL of the file to load.
+            batch_size (int): Number of rows to commit per transaction.
         """
+        # CALL { ... } IN TRANSACTIONS must run in an auto-commit transaction,
+        # so it can't go through write_transaction.
         with self.driver.session() as session:
-            # Had to break file into multiple to keep from breaking.
-            for f in Path(f_dir).glob("data_init*"):
-                f_path = str(f) if use_path else f"file:///{f.name}"
-                session.write_transaction(self._init_db, f_path)
+            session.run(self._init_db(batch_size), f_path=f_path).consume()
+
+    @staticmethod
+    def rebuild(
+        import_dir: Union[str, Path],
+        database: str = "neo4j",
+        neo4j_admin: Sequence[str] = ("neo4j-admin",),
+        dry_run: bool = False,
+    ) -> List[str]:
+        """Rebuild a database from the files written by write_admin_import using neo4j-admin import.
+
+        neo4j-admin import writes the store files directly rather than going through transactions,
+        which is much faster than init_db for a full rebuild. It must be run on the database server
+        while the database is stopped, and the database must be empty. Indices and constraints
+        are not created by the import, so init_db_indices should be run once the database is started.
+
+        Args:
+            import_dir (Union[str, Path]): Directory containing the import files, as seen by neo4j-admin.
+            database (str, optional): Name of the database to import into. Defaults to "neo4j".
+            neo4j_admin (Sequence[str], optional): Command used to run neo4j-admin, e.g. ("docker", "exec", "neo4j", "neo4j-admin"). Defaults to ("neo4j-admin",).
+            dry_run (bool, optional): Only build the command without running it. Defaults to False.
+
+        Returns:
+            List[str]: The neo4j-admin import command.
+        """
+        import_dir = Path(import_dir)
+        cmd = [
+            *neo4j_admin,
+            "import",
+            f"--database={database}",
+            f"--nodes=Station={import_dir / 'stations.csv'}",
+            f"--nodes=Observation={import_dir / 'observations.csv'}",
+            f"--relationships=OBSERVES={import_dir / 'observes.csv'}",
+            "--skip-bad-relationships=true",
+        ]
+        if dry_run:
+            return cmd
+
+        logger.info(f"Running {' '.join(cmd)}")
+        subprocess.run(cmd, check=True)
+        return cmd
 
     def query(
         self, station: str, start_time: int, end_time: int, element: str
@@ -54,69 +306,262 @@ class MesonetSatelliteDB:
         Returns:
             pd.DataFrame: A dataframe of the data returned from the query.
         """
+        with self.driver.session(fetch_size=self.fetch_size) as session:
+            dat = session.read_transaction(
+                self._build_query,
+                fetch_size=self.fetch_size,
+                station=station,
+                start_time=start_time,
+                end_time=end_time,
+                element=element,
+            )
+
+        if dat.empty:
+            logger.warning("No available data for this query.")
+            return pd.DataFrame()
+        return dat
+
+    def query_many(
+        self,
+        stations: List[str],
+        elements: List[str],
+        start_time: int,
+        end_time: int,
+    ) -> pd.DataFrame:
+        """Query the Neo4j database for satellite observations at many stations and elements in a single round-trip.
+
+        Args:
+            stations (List[str]): The names of the Montana Mesonet stations to query.
+            elements (List[str]): The satellite indicators to gather data for.
+            start_time (int): The start time to begin the query formatted as seconds since 1970-01-01.
+            end_time (int): The time to end the query formatted as seconds since 1970-01-01.
+
+        Returns:
+            pd.DataFrame: A dataframe of the data returned from the query.
+        """
+        with self.driver.session(fetch_size=self.fetch_size) as session:
+            dat = session.read_transaction(
+                self._build_query_many,
+                fetch_size=self.fetch_size,
+                stations=list(stations),
+                elements=list(elements),
+                start_time=start_time,
+                end_time=end_time,
+            )
+
+        if dat.empty:
+            logger.warning("No available data for this query.")
+            return pd.DataFrame()
+        return dat
+
+    def post(self, dat: pd.DataFrame, batch_size: int = 5000):
+        """Write data to the Neo4j database in batches.
+
+        Each batch is sent as a single UNWIND transaction over one reused session. If a batch
+        violates a uniqueness constraint, the rows in that batch are retried one at a time so
+        that only the offending observations are skipped.
+
+        Args:
+            dat (pd.DataFrame): Satellite data reformatted using the to_db_format function.
+            batch_size (int, optional): Number of observations to write per transaction. Defaults to 5000.
+        """
         with self.driver.session() as session:
+            self._post_batches(session, dat, batch_size, log_progress=True)
 
-            try:
-                response = session.write_transaction(
-                    self._build_query,
-                    station=station,
-                    start_time=start_time,
-                    end_time=end_time,
-                    element=element,
-                )
-                dat = pd.DataFrame(response)
-                dat.columns = [
-                    "station",
-                    "date",
-                    "platform",
-                    "element",
-                    "value",
-                    "units",
-                ]
-            except ValueError as e:
-                logger.exception(e)
-                logger.exception("No available data for this query.")
-                dat = pd.DataFrame()
-            return dat
+    def post_parallel(
+        self,
+        dat: pd.DataFrame,
+        workers: Optional[int] = None,
+        batch_size: int = 5000,
+        max_pending: Optional[int] = None,
+    ):
+        """Write data to the Neo4j database concurrently, one station at a time per worker.
 
-    def post(self, dat: pd.DataFrame):
-        """Write data to the Neo4j database.
+        The data are partitioned by station so that concurrent transactions never MERGE on the
+        same Station node. Each worker thread opens its own session from the shared driver
+        connection pool and writes its partition in batches (see MesonetSatelliteDB.post).
 
         Args:
             dat (pd.DataFrame): Satellite data reformatted using the to_db_format function.
+            workers (Optional[int], optional): Number of worker threads. If None, the number of CPUs is used. Defaults to None.
+            batch_size (int, optional): Number of observations to write per transaction. Defaults to 5000.
+            max_pending (Optional[int], optional): Maximum number of station partitions queued or in flight at once. If None, twice the number of workers is used. Defaults to None.
         """
-        gen = dat.iterrows()
-        for idx, row in gen:
-            if idx % 1000 == 0:
-                status = f"{(idx/len(dat))*100:2.3f}% of New Observations Uploaded"
+        n_rows = len(dat)
+        if n_rows == 0:
+            return
+        workers = workers or os.cpu_count() or 1
+        max_pending = max_pending or workers * 2
+        n_done = 0
+
+        partitions = (
+            part for _, part in dat.groupby("station", observed=True, sort=False)
+        )
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for part in partitions:
+                # Block until a slot frees up so partitions aren't all materialized at once.
+                while len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    n_done += sum(f.result() for f in done)
+                    logger.info(
+                        f"{(n_done/n_rows)*100:2.3f}% of New Observations Uploaded"
+                    )
+                pending.add(executor.submit(self._post_partition, part, batch_size))
+
+            for f in as_completed(pending):
+                n_done += f.result()
+                logger.info(f"{(n_done/n_rows)*100:2.3f}% of New Observations Uploaded")
+
+    def _post_partition(self, dat: pd.DataFrame, batch_size: int) -> int:
+        """Write a partition of observations in its own session. Used by post_parallel.
+
+        Args:
+            dat (pd.DataFrame): Satellite data reformatted using the to_db_format function.
+            batch_size (int): Number of observations to write per transaction.
+
+        Returns:
+            int: The number of rows in the partition.
+        """
+        with self.driver.session() as session:
+            self._post_batches(session, dat, batch_size, log_progress=False)
+        return len(dat)
+
+    def _post_batches(
+        self, session, dat: pd.DataFrame, batch_size: int, log_progress: bool
+    ):
+        """Write a DataFrame of observations to the database one batch at a time.
+
+        Args:
+            session: An open Neo4j session.
+            dat (pd.DataFrame): Satellite data reformatted using the to_db_format function.
+            batch_size (int): Number of observations to write per transaction.
+            log_progress (bool): Whether to log upload progress after each batch.
+        """
+        n_rows = len(dat)
+        for start in range(0, n_rows, batch_size):
+            rows = dat.iloc[start : start + batch_size].to_dict("records")
+            try:
+                session.write_transaction(self._post_batch, rows=rows)
+            except ConstraintError:
+                logger.warning(
+                    f"Batch starting at row {start} violates a constraint. Retrying row by row."
+                )
+                self._post_rows(session, rows)
+
+            if log_progress:
+                status = f"{(min(start + batch_size, n_rows)/n_rows)*100:2.3f}% of New Observations Uploaded"
                 logger.info(status)
+
+    def _post_rows(self, session, rows: List[Dict[str, Any]]):
+        """Write observations one transaction at a time, skipping ones that violate a constraint.
+
+        Args:
+            session: An open Neo4j session.
+            rows (List[Dict[str, Any]]): Records formatted using the to_db_format function.
+        """
+        for row in rows:
             try:
-                with self.driver.session() as session:
-                    session.write_transaction(self._post_data, **row.to_dict())
+                session.write_transaction(self._post_data, **row)
             except ConstraintError as e:
                 logger.exception(e)
 
-    def get_latest(self):
+    def migrate_observation_ids(self, batch_size: int = 10000):
+        """Rewrite string observation ids ('{station}_{timestamp}_{platform}_{element}') as integer keys.
+
+        Observations are migrated one station at a time. Only observations that still have a string
+        id are read, so the migration can be safely re-run if it is interrupted.
+
+        Args:
+            batch_size (int, optional): Number of observations to update per transaction. Defaults to 10000.
+        """
         with self.driver.session() as session:
-            response = session.write_transaction(self._get_latest)
-            dat = pd.DataFrame(response)
+            stations = session.read_transaction(self._get_stations)
+            for station in stations:
+                dat = session.read_transaction(self._get_string_ids, station=station)
+                if dat.empty:
+                    continue
+                dat = dat.assign(station=station)
+                dat = dat.assign(new=observation_key(dat))
+
+                rows = dat[["old", "new"]].to_dict("records")
+                for start in range(0, len(rows), batch_size):
+                    session.write_transaction(
+                        self._set_ids, rows=rows[start : start + batch_size]
+                    )
+                logger.info(f"Migrated {len(rows)} observation ids at {station}.")
+
+    def get_latest(self) -> pd.DataFrame:
+        """Get the most recent observation time for each platform and element.
+
+        Returns:
+            pd.DataFrame: DataFrame with date, platform and element columns.
+        """
+        with self.driver.session(fetch_size=self.fetch_size) as session:
+            dat = session.read_transaction(
+                self._get_latest, fetch_size=self.fetch_size
+            )
 
-        dat.columns = ["date", "platform", "element"]
         dat = dat.assign(date=pd.to_datetime(dat.date, unit="s"))
 
         return dat
 
     @staticmethod
-    def _get_latest(tx):
+    def _get_latest(tx, fetch_size):
+        result = tx.run(QUERIES["get_latest"])
+
+        return _stream_to_frame(result, LATEST_COLUMNS, fetch_size)
+
+    @staticmethod
+    def _profile(tx, query, params):
+        result = tx.run(f"PROFILE {query}", **params)
+        summary = result.consume()
+
+        def db_hits(plan):
+            children = plan.get("children", [])
+            return plan.get("dbHits", 0) + sum(db_hits(x) for x in children)
+
+        return {
+            "db_hits": db_hits(summary.profile),
+            "rows": summary.profile.get("rows", 0),
+        }
+
+    @staticmethod
+    def _get_stations(tx):
+        result = tx.run("MATCH (s:Station) RETURN s.name")
+        return [x[0] for x in result.values()]
+
+    @staticmethod
+    def _get_string_ids(tx, station):
+        # Integer ids never end with the element name, so this only matches unmigrated ids.
         result = tx.run(
-            """
-            MATCH (s:Station)-[o:OBSERVES]->(obs:Observation)\n
-            RETURN MAX(o.timestamp) as time, obs.platform as platform, obs.element as element\n
-            ORDER BY time
-            """
+            "MATCH (s:Station {name: $station})-[o:OBSERVES]->(obs:Observation) "
+            "WHERE obs.id ENDS WITH obs.element "
+            "RETURN obs.id, o.timestamp, obs.platform, obs.element",
+            station=station,
+        )
+        return pd.DataFrame(
+            result.values(), columns=["old", "timestamp", "platform", "element"]
+        )
+
+    @staticmethod
+    def _set_ids(tx, rows):
+        tx.run(
+            "UNWIND $rows AS row "
+            "MATCH (obs:Observation {id: row.old}) "
+            "SET obs.id = row.new",
+            rows=rows,
         )
 
-        return result.values()
+    @staticmethod
+    def _post_batch(tx, rows):
+        tx.run(
+            "UNWIND $rows AS row "
+            "MERGE (s:Station {name: row.station}) "
+            "MERGE (o:Observation {id: row.id, platform: row.platform, element: row.element, value: row.value, units: row.units}) "
+            "MERGE (s)-[:OBSERVES{timestamp: toInteger(row.timestamp)}]->(o);",
+            rows=rows,
+        )
 
     @staticmethod
     def _post_data(tx, **kwargs):
@@ -128,35 +573,30 @@ class MesonetSatelliteDB:
         )
 
     @staticmethod
-    def _build_query(tx, **kwargs):
-        result = tx.run(
-            "MATCH p = (obs:Observation)<-[o:OBSERVES]-(s:Station) "
-            "WHERE o.timestamp >= $start_time and o.timestamp <= $end_time and s.name = $station and obs.element = $element "
-            "RETURN s.name, o.timestamp, obs.platform,  obs.element, obs.value, obs.units",
-            **kwargs,
-        )
-        return result.values()
+    def _build_query(tx, fetch_size, **kwargs):
+        result = tx.run(QUERIES["query"], **kwargs)
+        return _stream_to_frame(result, QUERY_COLUMNS, fetch_size)
+
+    @staticmethod
+    def _build_query_many(tx, fetch_size, **kwargs):
+        result = tx.run(QUERIES["query_many"], **kwargs)
+        return _stream_to_frame(result, QUERY_COLUMNS, fetch_size)
 
     @staticmethod
     def _init_index(tx):
-        tx.run("CREATE INDEX timestampIndex FOR (o:OBSERVES) on (o.timestamp); ")
-        tx.run(
-            "CREATE CONSTRAINT obsIdConstraint "
-            "FOR (obs:Observation) "
-            "REQUIRE obs.id IS UNIQUE; "
-        )
-        tx.run(
-            "CREATE CONSTRAINT stationConstraint "
-            "FOR (s:Station) "
-            "REQUIRE s.name IS UNIQUE; "
-        )
+        for name in LEGACY_INDEXES:
+            tx.run(f"DROP INDEX {name} IF EXISTS")
+        for statement in INDEXES.values():
+            tx.run(statement)
 
     @staticmethod
-    def _init_db(tx, f_path):
-        tx.run(
+    def _init_db(batch_size):
+        return (
             "LOAD CSV WITH HEADERS FROM $f_path AS line "
+            "CALL { "
+            "WITH line "
             "MERGE (station:Station {name: line.station}) "
-            "CREATE (obs:Observation {id: line.id, platform: line.platform, element: line.element, value: toFloat(line.value), units: toString(line.units)}) "
-            "CREATE (station)-[:OBSERVES {timestamp: toInteger(line.timestamp)}]->(obs) ",
-            f_path=f_path,
+            "CREATE (obs:Observation {id: toInteger(line.id), platform: line.platform, element: line.element, value: toFloat(line.value), units: toString(line.units)}) "
+            "CREATE (station)-[:OBSERVES {timestamp: toInteger(line.timestamp)}]->(obs) "
+            f"}} IN TRANSACTIONS OF {int(batch_size)} ROWS"
         )
@@ -0,0 +1,327 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from neo4j import GraphDatabase
+
+from .Neo4jConn import (
+    LATEST_COLUMNS,
+    QUERY_COLUMNS,
+    MesonetSatelliteDB,
+    _stream_to_frame,
+)
+
+
+def _merge_series(
+    old_t: np.ndarray, old_v: np.ndarray, new_t: np.ndarray, new_v: np.ndarray
+):
+    """Merge new observations into a series, keeping the stored value where a timestamp already exists.
+
+    Args:
+        old_t (np.ndarray): Stored timestamps.
+        old_v (np.ndarray): Stored values.
+        new_t (np.ndarray): New timestamps.
+        new_v (np.ndarray): New values.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Merged timestamps and values, sorted by timestamp.
+    """
+    t = np.concatenate([old_t, new_t])
+    v = np.concatenate([old_v, new_v])
+    # np.unique returns the index of the first occurrence, so stored values win.
+    t, idx = np.unique(t, return_index=True)
+    return t, v[idx]
+
+
+class MesonetSeriesDB:
+    def __init__(
+        self, uri: str, user: str, password: str, fetch_size: int = 1000
+    ) -> None:
+        """Initialize a Neo4j observation store that keeps observations in yearly series nodes.
+
+        Instead of one Observation node and OBSERVES relationship per value, each station, platform,
+        element and year gets a single Series node holding sorted timestamp and value arrays:
+
+            (:Station {name})-[:HAS_SERIES]->(:Series {key, platform, element, units, year, timestamps, values})
+
+        This cuts the node and relationship count by the number of observations per year, and a
+        range query reads a handful of Series nodes and slices their arrays rather than filtering
+        every relationship. The store exposes the same post, query, query_many and get_latest
+        methods as MesonetSatelliteDB.
+
+        Args:
+            uri (str): The database URI for the Neo4j database.
+            user (str): The database Neo4j username.
+            password (str): The database Neo4j password.
+            fetch_size (int, optional): Number of Series records to pull from the server at a time when reading. Defaults to 1000.
+        """
+        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.fetch_size = fetch_size
+
+    def close(self):
+        """Close the connection to the Neo4j database."""
+        self.driver.close()
+
+    def init_db_indices(self):
+        """Initialize the Series key constraint and the index used by range queries."""
+        with self.driver.session() as session:
+            session.write_transaction(self._init_index)
+
+    def post(self, dat: pd.DataFrame, batch_size: int = 500):
+        """Write data to the series store.
+
+        Observations are grouped into their yearly series and merged into the stored arrays.
+        Observations at a timestamp that is already stored are skipped, so posting is idempotent.
+
+        Args:
+            dat (pd.DataFrame): Satellite data reformatted using the to_db_format function.
+            batch_size (int, optional): Number of series to update per transaction. Defaults to 500.
+        """
+        dat = dat.assign(
+            year=pd.to_datetime(dat["timestamp"], unit="s").dt.year.astype("int32")
+        ).sort_values("timestamp")
+
+        rows = []
+        for (station, platform, element, year), part in dat.groupby(
+            ["station", "platform", "element", "year"], observed=True, sort=False
+        ):
+            rows.append(
+                {
+                    "key": f"{station}|{platform}|{element}|{year}",
+                    "station": str(station),
+                    "platform": str(platform),
+                    "element": str(element),
+                    "year": int(year),
+                    "units": str(part["units"].iloc[0]),
+                    "timestamps": part["timestamp"].to_numpy(dtype=np.int64),
+                    "values": part["value"].to_numpy(dtype=np.float64),
+                }
+            )
+
+        with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                session.write_transaction(
+                    self._merge_batch, rows=rows[start : start + batch_size]
+                )
+                status = f"{(min(start + batch_size, len(rows))/len(rows))*100:2.3f}% of Series Updated"
+                logger.info(status)
+
+    def query(
+        self, station: str, start_time: int, end_time: int, element: str
+    ) -> pd.DataFrame:
+        """Query the series store for satellite observations at a station
+
+        Args:
+            station (str): The name of the Montana Mesonet station to query.
+            start_time (int): The start time to begin the query formatted as seconds since 1970-01-01.
+            end_time (int): The time to end the query formatted as seconds since 1970-01-01.
+            element (str): The satellite indicator to gather data for.
+
+        Returns:
+            pd.DataFrame: A dataframe of the data returned from the query.
+        """
+        return self.query_many([station], [element], start_time, end_time)
+
+    def query_many(
+        self,
+        stations: List[str],
+        elements: List[str],
+        start_time: int,
+        end_time: int,
+    ) -> pd.DataFrame:
+        """Query the series store for satellite observations at many stations and elements at once.
+
+        Only the Series nodes of the years overlapping the time range are read, and their arrays
+        are sliced to the range on the client.
+
+        Args:
+            stations (List[str]): The names of the Montana Mesonet stations to query.
+            elements (List[str]): The satellite indicators to gather data for.
+            start_time (int): The start time to begin the query formatted as seconds since 1970-01-01.
+            end_time (int): The time to end the query formatted as seconds since 1970-01-01.
+
+        Returns:
+            pd.DataFrame: A dataframe of the data returned from the query.
+        """
+        with self.driver.session(fetch_size=self.fetch_size) as session:
+            records = session.read_transaction(
+                self._build_query_many,
+                stations=list(stations),
+                elements=list(elements),
+                start_year=pd.to_datetime(start_time, unit="s").year,
+                end_year=pd.to_datetime(end_time, unit="s").year,
+            )
+
+        dat = self._explode(records, start_time, end_time)
+        if dat.empty:
+            logger.warning("No available data for this query.")
+            return pd.DataFrame()
+        return dat
+
+    def get_latest(self) -> pd.DataFrame:
+        """Get the most recent observation time for each platform and element.
+
+        Returns:
+            pd.DataFrame: DataFrame with date, platform and element columns.
+        """
+        with self.driver.session(fetch_size=self.fetch_size) as session:
+            dat = session.read_transaction(
+                self._get_latest, fetch_size=self.fetch_size
+            )
+
+        dat = dat.assign(date=pd.to_datetime(dat.date, unit="s"))
+
+        return dat
+
+    def migrate_from(
+        self, source: MesonetSatelliteDB, stations: Optional[List[str]] = None
+    ):
+        """Copy observations stored as Observation nodes into the series store, one station at a time.
+
+        The source database is not modified. Because posting skips timestamps that are already
+        stored, the migration can be safely re-run if it is interrupted.
+
+        Args:
+            source (MesonetSatelliteDB): Database using the Observation node layout.
+            stations (Optional[List[str]], optional): Stations to migrate. If None, all stations are migrated. Defaults to None.
+        """
+        with source.driver.session(fetch_size=source.fetch_size) as session:
+            stations = stations or session.read_transaction(source._get_stations)
+            for station in stations:
+                dat = session.read_transaction(
+                    self._get_observations,
+                    fetch_size=source.fetch_size,
+                    station=station,
+                )
+                if dat.empty:
+                    continue
+                self.post(dat.rename(columns={"date": "timestamp"}))
+                logger.info(f"Migrated {len(dat)} observations at {station}.")
+
+    @staticmethod
+    def _explode(
+        records: List[Dict[str, Any]], start_time: int, end_time: int
+    ) -> pd.DataFrame:
+        """Slice Series records to a time range and expand them into one row per observation.
+
+        Args:
+            records (List[Dict[str, Any]]): Series records returned by _build_query_many.
+            start_time (int): The start of the range formatted as seconds since 1970-01-01.
+            end_time (int): The end of the range formatted as seconds since 1970-01-01.
+
+        Returns:
+            pd.DataFrame: DataFrame with the same columns and dtypes as MesonetSatelliteDB.query.
+        """
+        if not records:
+            return pd.DataFrame(columns=list(QUERY_COLUMNS))
+
+        labels = {k: [] for k in ["station", "platform", "element", "units"]}
+        timestamps, values, lengths = [], [], []
+        for record in records:
+            t = np.asarray(record["timestamps"], dtype=np.int64)
+            # Timestamps are sorted, so the range is a contiguous slice.
+            lo = np.searchsorted(t, start_time, side="left")
+            hi = np.searchsorted(t, end_time, side="right")
+            timestamps.append(t[lo:hi])
+            values.append(np.asarray(record["values"], dtype=np.float64)[lo:hi])
+            lengths.append(hi - lo)
+            for k in labels:
+                labels[k].append(record[k])
+
+        dat = pd.DataFrame(
+            {
+                "station": np.repeat(labels["station"], lengths),
+                "date": np.concatenate(timestamps),
+                "platform": np.repeat(labels["platform"], lengths),
+                "element": np.repeat(labels["element"], lengths),
+                "value": np.concatenate(values),
+                "units": np.repeat(labels["units"], lengths),
+            }
+        ).astype(QUERY_COLUMNS)
+
+        return dat.sort_values(["station", "element", "date"]).reset_index(drop=True)
+
+    @staticmethod
+    def _merge_batch(tx, rows):
+        # Read the stored arrays in the same transaction so a retried transaction merges again.
+        stored = tx.run(
+            "MATCH (ser:Series) WHERE ser.key IN $keys "
+            "RETURN ser.key AS key, ser.timestamps AS timestamps, ser.values AS values",
+            keys=[row["key"] for row in rows],
+        )
+        stored = {r["key"]: (r["timestamps"], r["values"]) for r in stored}
+
+        params = []
+        for row in rows:
+            t, v = row["timestamps"], row["values"]
+            if row["key"] in stored:
+                old_t, old_v = stored[row["key"]]
+                t, v = _merge_series(
+                    np.asarray(old_t, dtype=np.int64),
+                    np.asarray(old_v, dtype=np.float64),
+                    t,
+                    v,
+                )
+            params.append({**row, "timestamps": t.tolist(), "values": v.tolist()})
+
+        tx.run(
+            "UNWIND $rows AS row "
+            "MERGE (s:Station {name: row.station}) "
+            "MERGE (ser:Series {key: row.key}) "
+            "ON CREATE SET ser.platform = row.platform, ser.element = row.element, ser.year = row.year "
+            "MERGE (s)-[:HAS_SERIES]->(ser) "
+            "SET ser.units = row.units, ser.timestamps = row.timestamps, ser.values = row.values",
+            rows=params,
+        )
+
+    @staticmethod
+    def _build_query_many(tx, **kwargs):
+        result = tx.run(
+            "MATCH (s:Station)-[:HAS_SERIES]->(ser:Series) "
+            "WHERE s.name IN $stations and ser.element IN $elements and ser.year >= $start_year and ser.year <= $end_year "
+            "RETURN s.name AS station, ser.platform AS platform, ser.element AS element, ser.units AS units, "
+            "ser.timestamps AS timestamps, ser.values AS values",
+            **kwargs,
+        )
+        return [record.data() for record in result]
+
+    @staticmethod
+    def _get_latest(tx, fetch_size):
+        # Series arrays are sorted, so the last timestamp is the most recent.
+        result = tx.run(
+            """
+            MATCH (ser:Series)\n
+            RETURN MAX(ser.timestamps[-1]) as time, ser.platform as platform, ser.element as element\n
+            ORDER BY time
+            """
+        )
+
+        return _stream_to_frame(result, LATEST_COLUMNS, fetch_size)
+
+    @staticmethod
+    def _get_observations(tx, fetch_size, station):
+        result = tx.run(
+            "MATCH (s:Station {name: $station})-[o:OBSERVES]->(obs:Observation) "
+            "RETURN s.name, o.timestamp, obs.platform, obs.element, obs.value, obs.units",
+            station=station,
+        )
+        return _stream_to_frame(result, QUERY_COLUMNS, fetch_size)
+
+    @staticmethod
+    def _init_index(tx):
+        tx.run(
+            "CREATE CONSTRAINT seriesKeyConstraint IF NOT EXISTS "
+            "FOR (ser:Series) "
+            "REQUIRE ser.key IS UNIQUE"
+        )
+        tx.run(
+            "CREATE CONSTRAINT stationConstraint IF NOT EXISTS "
+            "FOR (s:Station) "
+            "REQUIRE s.name IS UNIQUE"
+        )
+        tx.run(
+            "CREATE INDEX seriesElementYearIndex IF NOT EXISTS "
+            "FOR (ser:Series) ON (ser.element, ser.year)"
+        )
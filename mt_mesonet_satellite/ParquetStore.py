@@ -0,0 +1,272 @@
+import os
+import uuid
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from .to_db_format import observation_key
+from .Vocabulary import VOCABULARY
+
+SCHEMA = pa.schema(
+    [
+        ("station", pa.string()),
+        ("timestamp", pa.int64()),
+        ("value", pa.float64()),
+        ("units", pa.string()),
+        ("id", pa.int64()),
+        ("platform", pa.string()),
+        ("element", pa.string()),
+        ("year", pa.int32()),
+    ]
+)
+
+PARTITIONING = ds.partitioning(
+    pa.schema(
+        [
+            ("platform", pa.string()),
+            ("element", pa.string()),
+            ("year", pa.int32()),
+        ]
+    ),
+    flavor="hive",
+)
+
+# Columns stored in the files. The partition columns are only stored in the directory names.
+FILE_SCHEMA = pa.schema([x for x in SCHEMA if x.name not in PARTITIONING.schema.names])
+
+
+class ParquetObservationStore:
+    def __init__(
+        self,
+        root: Union[str, Path],
+        row_group_size: int = 100_000,
+        max_files: int = 8,
+    ) -> None:
+        """Initialize a local columnar observation store.
+
+        Observations are stored as a Parquet dataset partitioned by platform, element and year
+        (e.g. root/platform=VNP13A1.001/element=NDVI/year=2021/), and the shared category vocabulary is
+        saved next to it in _vocabulary.json. Within each file rows are sorted
+        by station and timestamp, so row group statistics let queries skip data for other stations
+        and times. Each post adds a file to the partitions it touches, so once a partition has more
+        than max_files files they are compacted into one. The store exposes the same post, query
+        and get_latest methods as MesonetSatelliteDB.
+
+        Args:
+            root (Union[str, Path]): Directory to store the Parquet dataset in.
+            row_group_size (int, optional): Maximum number of rows per Parquet row group. Defaults to 100_000.
+            max_files (int, optional): Maximum number of files in a partition before post compacts it. Defaults to 8.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.max_files = max_files
+        VOCABULARY.load(self.root / "_vocabulary.json")
+
+    def close(self):
+        """No-op provided for interface compatibility with MesonetSatelliteDB."""
+        pass
+
+    def _dataset(self) -> ds.Dataset:
+        return ds.dataset(
+            self.root, schema=SCHEMA, format="parquet", partitioning=PARTITIONING
+        )
+
+    def post(self, dat: pd.DataFrame):
+        """Write data to the Parquet store. Observations whose id is already stored are skipped.
+
+        Args:
+            dat (pd.DataFrame): Satellite data reformatted using the to_db_format function.
+        """
+        dat = dat[["station", "timestamp", "value", "units", "id", "platform", "element"]]
+        dat = dat.assign(
+            year=pd.to_datetime(dat.timestamp, unit="s").dt.year.astype("int32")
+        )
+
+        # Only read the id column of the partitions that are being written to.
+        touched = (
+            ds.field("platform").isin(dat.platform.unique().tolist())
+            & ds.field("element").isin(dat.element.unique().tolist())
+            & ds.field("year").isin(dat.year.unique().tolist())
+        )
+        existing = self._dataset().to_table(columns=["id"], filter=touched)
+        existing = existing.column("id").to_pandas()
+        dat = dat[~dat["id"].isin(existing)]
+
+        if dat.empty:
+            logger.info("No new observations to write to the Parquet store.")
+            return
+
+        dat = VOCABULARY.encode(dat)
+        dat = dat.sort_values(["platform", "element", "station", "timestamp"])
+        table = pa.Table.from_pandas(dat, schema=SCHEMA, preserve_index=False)
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            max_rows_per_group=self.row_group_size,
+        )
+        VOCABULARY.save(self.root / "_vocabulary.json")
+        logger.info(f"{len(dat)} new observations written to the Parquet store.")
+        self.compact(max_files=self.max_files, filter=touched)
+
+    def compact(self, max_files: int = 1, filter: Optional[ds.Expression] = None):
+        """Merge the files of each partition that has more than max_files files into a single file.
+
+        The merged file is sorted by station and timestamp, so row group statistics stay useful
+        for pruning. It is written under a name the dataset ignores and renamed into place before
+        the old files are removed. If an interruption leaves both behind, the next compaction drops
+        the duplicated observations.
+
+        Args:
+            max_files (int, optional): Maximum number of files a partition can have before it is compacted. Defaults to 1.
+            filter (Optional[ds.Expression], optional): Only compact the partitions matching this partition expression. Defaults to None.
+        """
+        partitions = {}
+        for fragment in self._dataset().get_fragments(filter=filter):
+            path = Path(fragment.path)
+            partitions.setdefault(path.parent, []).append(path)
+
+        for dirname, paths in partitions.items():
+            if len(paths) <= max_files:
+                continue
+
+            tables = [pq.read_table(x).cast(FILE_SCHEMA) for x in paths]
+            dat = pa.concat_tables(tables).to_pandas()
+            dat = dat.drop_duplicates(subset="id").sort_values(["station", "timestamp"])
+            table = pa.Table.from_pandas(dat, schema=FILE_SCHEMA, preserve_index=False)
+
+            name = f"part-{uuid.uuid4().hex}-0.parquet"
+            # Files starting with '_' are skipped by dataset discovery until the rename.
+            tmp = dirname / f"_{name}.tmp"
+            pq.write_table(table, tmp, row_group_size=self.row_group_size)
+            os.replace(tmp, dirname / name)
+            for path in paths:
+                path.unlink()
+            logger.info(f"Compacted {len(paths)} files in {dirname}.")
+
+    def query(
+        self, station: str, start_time: int, end_time: int, element: str
+    ) -> pd.DataFrame:
+        """Query the Parquet store for satellite observations at a station
+
+        Args:
+            station (str): The name of the Montana Mesonet station to query.
+            start_time (int): The start time to begin the query formatted as seconds since 1970-01-01.
+            end_time (int): The time to end the query formatted as seconds since 1970-01-01.
+            element (str): The satellite indicator to gather data for.
+
+        Returns:
+            pd.DataFrame: A dataframe of the data returned from the query.
+        """
+        return self.query_many([station], [element], start_time, end_time)
+
+    def query_many(
+        self,
+        stations: List[str],
+        elements: List[str],
+        start_time: int,
+        end_time: int,
+    ) -> pd.DataFrame:
+        """Query the Parquet store for satellite observations at many stations and elements in a single scan.
+
+        Args:
+            stations (List[str]): The names of the Montana Mesonet stations to query.
+            elements (List[str]): The satellite indicators to gather data for.
+            start_time (int): The start time to begin the query formatted as seconds since 1970-01-01.
+            end_time (int): The time to end the query formatted as seconds since 1970-01-01.
+
+        Returns:
+            pd.DataFrame: A dataframe of the data returned from the query.
+        """
+        start_year = pd.to_datetime(start_time, unit="s").year
+        end_year = pd.to_datetime(end_time, unit="s").year
+        table = self._dataset().to_table(
+            columns=["station", "timestamp", "platform", "element", "value", "units"],
+            filter=ds.field("element").isin(list(elements))
+            & (ds.field("year") >= start_year)
+            & (ds.field("year") <= end_year)
+            & ds.field("station").isin(list(stations))
+            & (ds.field("timestamp") >= start_time)
+            & (ds.field("timestamp") <= end_time),
+        )
+        dat = table.to_pandas()
+        if dat.empty:
+            logger.warning("No available data for this query.")
+            return pd.DataFrame()
+
+        dat = dat.rename(columns={"timestamp": "date"})
+        return dat.sort_values(["station", "element", "date"]).reset_index(drop=True)
+
+    def migrate_observation_ids(self):
+        """Rewrite string observation ids ('{station}_{timestamp}_{platform}_{element}') as integer keys.
+
+        Each file with string ids is rewritten in place. Files that have already been migrated are
+        skipped, so the migration can be safely re-run if it is interrupted.
+        """
+        dataset = ds.dataset(self.root, format="parquet", partitioning=PARTITIONING)
+        for fragment in dataset.get_fragments():
+            table = pq.read_table(fragment.path)
+            if pa.types.is_integer(table.schema.field("id").type):
+                continue
+
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            dat = table.to_pandas()
+            dat = dat.assign(platform=keys["platform"], element=keys["element"])
+            ids = pa.array(observation_key(dat), type=pa.int64())
+            table = table.set_column(table.schema.get_field_index("id"), "id", ids)
+
+            # Write to a temporary file and rename it so an interruption can't corrupt the store.
+            # Files starting with '_' are ignored by the dataset, like the ones compact writes.
+            pth = Path(fragment.path)
+            tmp = pth.with_name(f"_{pth.name}.tmp")
+            pq.write_table(table, tmp, row_group_size=self.row_group_size)
+            os.replace(tmp, pth)
+            logger.info(f"Migrated {len(dat)} observation ids in {fragment.path}.")
+
+    def get_latest(self) -> pd.DataFrame:
+        """Get the most recent observation time for each platform and element.
+
+        Returns:
+            pd.DataFrame: DataFrame with date, platform and element columns.
+        """
+        dataset = self._dataset()
+
+        # Find the most recent year partition for each platform/element from the file paths
+        # so that only those files need to be scanned.
+        latest = {}
+        for fragment in dataset.get_fragments():
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            k = (keys["platform"], keys["element"])
+            latest[k] = max(latest.get(k, keys["year"]), keys["year"])
+
+        out = []
+        for (platform, element), year in latest.items():
+            table = dataset.to_table(
+                columns=["timestamp"],
+                filter=(ds.field("platform") == platform)
+                & (ds.field("element") == element)
+                & (ds.field("year") == year),
+            )
+            out.append(
+                {
+                    "date": pc.max(table.column("timestamp")).as_py(),
+                    "platform": platform,
+                    "element": element,
+                }
+            )
+
+        dat = pd.DataFrame(out, columns=["date", "platform", "element"])
+        dat = dat.sort_values("date").reset_index(drop=True)
+        dat = dat.assign(date=pd.to_datetime(dat.date, unit="s"))
+
+        return dat
@@ -0,0 +1,230 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Union
+
+import pandas as pd
+from loguru import logger
+
+from .Clean import iter_clean_files
+from .KeyIndex import KeyIndex
+from .Neo4jConn import MesonetSatelliteDB
+from .to_db_format import to_db_format
+
+# Put on a queue to tell the stage reading it that no more items are coming.
+_DONE = object()
+
+
+def post_formatted(
+    conn,
+    dat: pd.DataFrame,
+    workers: Optional[int] = None,
+    key_index: Optional[KeyIndex] = None,
+):
+    """Write formatted observations to an observation store and record their keys in the key index.
+
+    Args:
+        conn: The observation store to write to.
+        dat (pd.DataFrame): Satellite data reformatted using the to_db_format function.
+        workers (Optional[int], optional): Number of threads used to write to a Neo4j database. If None, the number of CPUs is used. Defaults to None.
+        key_index (Optional[KeyIndex], optional): Index of stored observation keys to add the posted keys to. Defaults to None.
+    """
+    # Every key of a re-run chunk may already be in the key index.
+    if dat.empty:
+        return
+    if isinstance(conn, MesonetSatelliteDB):
+        conn.post_parallel(dat, workers=workers)
+    else:
+        conn.post(dat)
+    if key_index is not None:
+        key_index.add(dat["id"].to_numpy())
+
+
+@dataclass
+class StageMetrics:
+    """Class to hold timing metrics of a pipeline stage.
+
+    Attributes:
+        name (str): The name of the stage.
+        items (int): Number of items the stage has processed.
+        rows (int): Number of rows in the items the stage has produced.
+        busy (float): Seconds spent processing items.
+        idle (float): Seconds spent waiting for input or for room in the next queue.
+    """
+
+    name: str
+    items: int = 0
+    rows: int = 0
+    busy: float = 0
+    idle: float = 0
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.items} items, {self.rows} rows, {self.busy:.1f}s busy, {self.idle:.1f}s idle"
+
+
+@dataclass
+class IngestPipeline:
+    """Class to clean, format and store downloaded AppEEARS files in background threads.
+
+    Files handed to submit flow through three stages, each in its own thread:
+
+        clean (Cleaner) -> format (to_db_format) -> write (store post)
+
+    Stages are connected by bounded queues, so memory stays bounded and a slow stage holds back
+    the ones before it, down to submit itself. This lets data from tasks that have already
+    completed be stored while other tasks are still running on AppEEARS. If a stage fails, the
+    rest of the input is drained without being processed and the error is raised by close.
+
+    Use it as a context manager, or call close when all files have been submitted:
+
+        with IngestPipeline(conn) as pipeline:
+            wait_on_tasks(tasks, session, dirname, on_download=pipeline.submit)
+
+    Attributes:
+        conn: The observation store to write to.
+        workers (Optional[int]): Number of threads used to write to a Neo4j database. If None, the number of CPUs is used. Defaults to None.
+        chunksize (int): Number of rows of each .csv to clean, format and post at a time. Defaults to 100000.
+        to_daily (bool): Whether or not to aggregate sub-daily observations to daily means. Defaults to True.
+        key_index (Optional[KeyIndex]): Index of observation keys that are already stored. Defaults to None.
+        max_queued (int): Maximum number of items waiting between two stages. Defaults to 4.
+        metrics (List[StageMetrics]): Timing metrics of each stage.
+    """
+
+    conn: object
+    workers: Optional[int] = None
+    chunksize: int = 100000
+    to_daily: bool = True
+    key_index: Optional[KeyIndex] = None
+    max_queued: int = 4
+    metrics: List[StageMetrics] = field(init=False)
+    _queues: List[queue.Queue] = field(init=False, repr=False)
+    _threads: List[threading.Thread] = field(init=False, repr=False)
+    _error: Optional[BaseException] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        stages = [
+            ("clean", self._clean),
+            ("format", self._format),
+            ("write", self._write),
+        ]
+        self.metrics = [StageMetrics(name) for name, _ in stages]
+        self._queues = [queue.Queue(maxsize=self.max_queued) for _ in stages]
+        # The write stage has no output queue.
+        outputs = self._queues[1:] + [None]
+        self._threads = [
+            threading.Thread(
+                target=self._run,
+                args=(fn, inbox, outbox, metrics),
+                name=f"ingest-{name}",
+                daemon=True,
+            )
+            for (name, fn), inbox, outbox, metrics in zip(
+                stages, self._queues, outputs, self.metrics
+            )
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(self, files: Iterable[Union[str, Path]]):
+        """Queue downloaded files to be cleaned, formatted and stored. Blocks while the pipeline is full.
+
+        Args:
+            files (Iterable[Union[str, Path]]): The .csv files to ingest.
+        """
+        files = [Path(f) for f in files if Path(f).suffix == ".csv"]
+        if files:
+            self._queues[0].put(files)
+
+    def close(self):
+        """Wait for all submitted files to be stored, flush the key index and log the metrics of each stage.
+
+        Raises:
+            BaseException: The first error raised by a stage.
+        """
+        self._queues[0].put(_DONE)
+        for thread in self._threads:
+            thread.join()
+        # Save the keys that were posted, even if a stage failed.
+        if self.key_index is not None:
+            self.key_index.flush()
+        for metrics in self.metrics:
+            logger.info(f"Ingest {metrics}")
+        if self._error is not None:
+            raise self._error
+
+    def _run(
+        self,
+        fn: Callable,
+        inbox: queue.Queue,
+        outbox: Optional[queue.Queue],
+        metrics: StageMetrics,
+    ):
+        """Run a stage, passing each output of fn(item) to the next stage, until _DONE is received.
+
+        Args:
+            fn (Callable): Generator function that processes an item of the stage.
+            inbox (queue.Queue): Queue to read items from.
+            outbox (Optional[queue.Queue]): Queue to put outputs on, or None for the last stage.
+            metrics (StageMetrics): Metrics to update.
+        """
+        while True:
+            start = time.perf_counter()
+            item = inbox.get()
+            metrics.idle += time.perf_counter() - start
+            if item is _DONE:
+                break
+            if self._error is not None:
+                continue
+
+            try:
+                outputs = fn(item)
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        out = next(outputs)
+                    except StopIteration:
+                        metrics.busy += time.perf_counter() - start
+                        break
+                    metrics.busy += time.perf_counter() - start
+                    metrics.rows += len(out)
+                    if outbox is not None:
+                        start = time.perf_counter()
+                        outbox.put(out)
+                        metrics.idle += time.perf_counter() - start
+                metrics.items += 1
+            except Exception as e:
+                logger.exception(f"Ingest stage {metrics.name} failed.")
+                self._error = e
+
+        if outbox is not None:
+            outbox.put(_DONE)
+
+    def _clean(self, files: List[Path]):
+        yield from iter_clean_files(
+            files, chunksize=self.chunksize, to_daily=self.to_daily
+        )
+
+    def _format(self, cleaned: pd.DataFrame):
+        formatted = to_db_format(
+            f=cleaned,
+            neo4j_pth=None,
+            out_name=None,
+            write=False,
+            split=False,
+            key_index=self.key_index,
+        )
+        yield formatted.reset_index(drop=True)
+
+    def _write(self, formatted: pd.DataFrame):
+        if formatted.empty:
+            return
+        post_formatted(self.conn, formatted, self.workers, self.key_index)
+        yield formatted
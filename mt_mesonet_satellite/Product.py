@@ -1,9 +1,21 @@
 from __future__ import annotations
 
+import json
+import os
+import tempfile
+import time
 from dataclasses import dataclass, field, fields
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
 
 import requests
+from loguru import logger
+
+from .Client import CLIENT, AppEEARSClient
+from .Task import InvalidRequestError
+
+# Bump this if the format of cached product metadata changes to invalidate old cache files.
+CACHE_VERSION = 1
 
 
 @dataclass
@@ -37,6 +49,115 @@ class Layer:
         return Layer(**{k: v for k, v in d.items() if k in cls_fields})
 
 
+@dataclass
+class ProductCache:
+    """Class to cache AppEEARS product layer metadata in memory and on disk.
+
+    Cached metadata are reused until they are older than ttl seconds. Stale entries are revalidated
+    with the ETag returned by AppEEARS when one is available. If AppEEARS can't be reached or returns
+    an error, stale entries are used so that data can be reprocessed offline.
+
+    Attributes:
+        cache_dir (Union[str, Path]): Directory to store cached metadata in. Defaults to the 'ProductCache' environment variable or ~/.cache/mt_mesonet_satellite.
+        ttl (int): Number of seconds cached metadata are considered fresh. Defaults to one week.
+        client (AppEEARSClient): HTTP client used to talk to AppEEARS. Defaults to the shared client.
+    """
+
+    cache_dir: Union[str, Path] = field(
+        default_factory=lambda: os.getenv(
+            "ProductCache", Path.home() / ".cache" / "mt_mesonet_satellite"
+        )
+    )
+    ttl: int = 7 * 24 * 60 * 60
+    client: AppEEARSClient = field(
+        default_factory=lambda: CLIENT, repr=False, compare=False
+    )
+    _memo: Dict[str, Dict[str, Any]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __post_init__(self):
+        self.cache_dir = Path(self.cache_dir)
+
+    def get(self, product: str) -> Dict[str, Any]:
+        """Get the layer metadata for a product, only requesting it from AppEEARS if the cache is stale.
+
+        Args:
+            product (str): The name of the product formatted as NAMEOFPRODUCT.XXX.
+
+        Returns:
+            Dict[str, Any]: The layer metadata returned by the AppEEARS /product endpoint.
+
+        Raises:
+            InvalidRequestError: Raised if the metadata can't be retrieved and isn't cached.
+        """
+        entry = self._memo.get(product) or self._read(product)
+        if entry and time.time() - entry["fetched"] < self.ttl:
+            self._memo[product] = entry
+            return entry["layers"]
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+
+        try:
+            response = self.client.get("product/{0}".format(product), headers=headers)
+        except requests.exceptions.RequestException as e:
+            if entry:
+                logger.warning(
+                    f"Unable to reach AppEEARS ({e}). Using cached {product} metadata."
+                )
+                return entry["layers"]
+            raise InvalidRequestError(
+                f"Unable to get {product} metadata from AppEEARS ({e})."
+            )
+
+        if response.status_code == 304 and entry:
+            entry["fetched"] = time.time()
+        elif response.status_code != 200:
+            if entry:
+                logger.warning(
+                    f"AppEEARS returned status {response.status_code}. Using cached {product} metadata."
+                )
+                return entry["layers"]
+            raise InvalidRequestError(
+                f"Unable to get {product} metadata from AppEEARS (status {response.status_code})."
+            )
+        else:
+            entry = {
+                "version": CACHE_VERSION,
+                "fetched": time.time(),
+                "etag": response.headers.get("ETag"),
+                "layers": response.json(),
+            }
+
+        self._memo[product] = entry
+        self._write(product, entry)
+        return entry["layers"]
+
+    def _path(self, product: str) -> Path:
+        return self.cache_dir / f"{product}.json"
+
+    def _read(self, product: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(product)) as con:
+                entry = json.load(con)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry if entry.get("version") == CACHE_VERSION else None
+
+    def _write(self, product: str, entry: Dict[str, Any]):
+        # Write to a temporary file and rename it so concurrent readers never see a partial file.
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as con:
+            json.dump(entry, con)
+        os.replace(tmp, self._path(product))
+
+
+PRODUCT_CACHE = ProductCache()
+
+
 @dataclass
 class Product:
     """Class to represent a satellite data product
@@ -44,20 +165,19 @@ class Product:
     Attributes:
         product (str): The name of the product to get data for. Formatted as NAMEOFPRODUCT.XXX, where XXX is the product version number.
         layers (Dict[str, Layer]): List of layers associated with a product.
+        cache (ProductCache): Cache to get product metadata from. Defaults to a cache shared by all products.
     """
 
     product: str
     layers: Dict[str, Layer] = field(init=False)
+    cache: ProductCache = field(
+        default_factory=lambda: PRODUCT_CACHE, repr=False, compare=False
+    )
 
     def __post_init__(self):
         self.layers = self.get_layers()
 
     def get_layers(self):
-        response = requests.get(
-            "https://appeears.earthdatacloud.nasa.gov/api/product/{0}".format(
-                self.product
-            )
-        )
-        layer_response = response.json()
+        layer_response = self.cache.get(self.product)
 
         return {k: Layer.from_dict(v) for k, v in layer_response.items()}
@@ -4,7 +4,7 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-import requests
+from .Client import CLIENT, AppEEARSClient
 
 
 @dataclass
@@ -23,6 +23,7 @@ class Session:
         username (Optional[str]): Earthdata username. If left as None, ~/.netrc will be used. Defaults to None.
         password (Optioanl[str]): Earthdata password. If left as None, ~/.netrc will be used. Defautls to None.
         dot_env (Optional[bool]): Whether to load Earthdata user and password from your system's environment.
+        client (AppEEARSClient): HTTP client used to talk to AppEEARS. Defaults to the shared client.
         creds (Dict[str, str]): Credentaials for a session provided after login.
         token (str): Token necessary to use AppEEARS API. Created upon login.
     """
@@ -30,6 +31,9 @@ class Session:
     username: Optional[str] = None
     password: Optional[str] = None
     dot_env: Optional[bool] = True
+    client: AppEEARSClient = field(
+        default_factory=lambda: CLIENT, repr=False, compare=False
+    )
     creds: Dict[str, str] = field(init=False)
     token: str = field(init=False)
 
@@ -87,10 +91,7 @@ class Session:
         """
         if not username or not password:
             username, password = self._get_auth(self.dot_env)
-        response = requests.post(
-            "https://appeears.earthdatacloud.nasa.gov/api/login",
-            auth=(username, password),
-        )
+        response = self.client.post("login", auth=(username, password))
 
         assert (
             response.status_code == 200
@@ -101,10 +102,7 @@ class Session:
 
     def logout(self):
         """Method to logout after a session and deactivate the token associated with the session."""
-        response = requests.post(
-            "https://appeears.earthdatacloud.nasa.gov/api/logout",
-            headers={"Authorization": "Bearer {0}".format(self.token)},
-        )
+        response = self.client.post("logout", self.token)
 
         assert (
             response.status_code == 204
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 import requests
 
+from .Client import CLIENT, AppEEARSClient
 from .Geom import Point, Poly
 
+if TYPE_CHECKING:
+    from .AsyncClient import AsyncAppEEARSClient
+
 
 class PendingTaskError(Exception):
     """Raised when download is attempted on running task."""
@@ -25,19 +33,60 @@ class InvalidRequestError(Exception):
         super().__init__(self.message)
 
 
-def list_task(token: str) -> List[Dict[str, Any]]:
+class DownloadError(Exception):
+    """Raised when a file can't be downloaded or doesn't match the bundle manifest."""
+
+    def __init__(self, message="Downloaded file doesn't match the bundle manifest."):
+        self.message = message
+        super().__init__(self.message)
+
+
+def _verify_file(pth: Path, f: Dict[str, Any]):
+    """Check a downloaded file against the size and SHA-256 checksum listed in the bundle manifest.
+
+    A file that is shorter than expected is kept so the download can be resumed. Otherwise, a file
+    that doesn't match is deleted.
+
+    Args:
+        pth (Path): Path of the downloaded file.
+        f (Dict[str, Any]): Dictionary containing information about the file from the bundle manifest.
+
+    Raises:
+        DownloadError: Raised if the size or checksum of the file doesn't match the manifest.
+    """
+    size = pth.stat().st_size
+    if f.get("file_size") is not None and size != f["file_size"]:
+        if size > f["file_size"]:
+            pth.unlink()
+        raise DownloadError(
+            f"{f['file_name']} is {size} bytes, but the bundle manifest lists {f['file_size']}."
+        )
+
+    if f.get("sha256"):
+        checksum = hashlib.sha256()
+        with open(pth, "rb") as con:
+            for block in iter(lambda: con.read(1024 * 1024), b""):
+                checksum.update(block)
+        if checksum.hexdigest() != f["sha256"]:
+            pth.unlink()
+            raise DownloadError(
+                f"The checksum of {f['file_name']} doesn't match the bundle manifest."
+            )
+
+
+def list_task(
+    token: str, client: Optional[AppEEARSClient] = None
+) -> List[Dict[str, Any]]:
     """List both completed and currently running tasks.
 
     Args:
         token (str): Session validation token.
+        client (Optional[AppEEARSClient], optional): HTTP client to use. If None, the shared client is used. Defaults to None.
 
     Returns:
         List[Dict[str, Any]]: List of dicts containing information about all tasks.
     """
-    response = requests.get(
-        "https://appeears.earthdatacloud.nasa.gov/api/task",
-        headers={"Authorization": "Bearer {0}".format(token)},
-    )
+    response = (client or CLIENT).get("task", token)
     task_response = response.json()
     return task_response
 
@@ -51,10 +100,14 @@ class Task:
     Attributes:
         task_id (Optional[str]): A unique ID associated with a given task.
         status (Optional[str]): The status of the task. One of 'error', 'pending' or 'done'.
+        client (AppEEARSClient): HTTP client used to talk to AppEEARS. Defaults to the shared client.
     """
 
     task_id: Optional[str] = None
     status: Optional[str] = None
+    client: AppEEARSClient = field(
+        default_factory=lambda: CLIENT, repr=False, compare=False
+    )
 
     @classmethod
     def from_response(cls, response: Dict[str, Any]) -> Task:
@@ -78,80 +131,174 @@ class Task:
         Returns:
             str: one of 'error', 'pending' or 'done'.
         """
-        response = requests.get(
-            "https://appeears.earthdatacloud.nasa.gov/api/status/{0}".format(
-                self.task_id
-            ),
-            headers={"Authorization": "Bearer {0}".format(token)},
-        )
+        response = self.client.get("status/{0}".format(self.task_id), token)
+        return self._set_status(response.status_code, response.json())
+
+    async def status_update_async(
+        self, token: str, client: AsyncAppEEARSClient
+    ) -> str:
+        """Get an update on the status of the task using an asyncio client. See Task.status_update.
 
-        status_response = response.json()
-        if response.status_code == 200 and "status" not in status_response:
+        Args:
+            token (str): Token from Session object.
+            client (AsyncAppEEARSClient): The asyncio client to make the request with.
+
+        Returns:
+            str: one of 'error', 'pending' or 'done'.
+        """
+        response = await client.get("status/{0}".format(self.task_id), token)
+        return self._set_status(response.status_code, response.json())
+
+    def _set_status(self, status_code: int, status_response: Dict[str, Any]) -> str:
+        if status_code == 200 and "status" not in status_response:
             return "pending"
         self.status = status_response["status"]
         return self.status
 
-    def _write_file(self, f: Dict[str, Any], dirname: Union[Path, str], token: str):
+    def _write_file(
+        self,
+        f: Dict[str, Any],
+        dirname: Union[Path, str],
+        token: str,
+        chunk_size: int = 1024 * 1024,
+    ) -> Path:
         """Write data from a completed task to disk.
 
+        The file is written to a '.part' file that is only renamed once its size and checksum match
+        the bundle manifest, so an interrupted download never leaves a truncated .csv behind. If a
+        '.part' file already exists, the download resumes from where it left off.
+
         Args:
             f (Dict[str, Any]): Dictionary containing information about a file.
             dirname (Union[Path, str]): Directory to write the file out to.
             token (str): token from the Session object.
-        """
-        response = requests.get(
-            "https://appeears.earthdatacloud.nasa.gov/api/bundle/{0}/{1}".format(
-                self.task_id, f["file_id"]
-            ),
-            headers={"Authorization": "Bearer {0}".format(token)},
-            allow_redirects=True,
-            stream=True,
-        )
+            chunk_size (int, optional): Number of bytes to write at a time. Defaults to 1 MiB.
 
-        pth = Path(dirname) / f["file_name"]
-        pth.touch()
-        with open(pth, "wb") as con:
-            for data in response.iter_content(chunk_size=8192):
-                con.write(data)
+        Returns:
+            Path: Path of the written file.
 
-    def download(self, dirname: Union[Path, str], token: str, download_all=False):
+        Raises:
+            DownloadError: Raised if the request fails or the downloaded file doesn't match the bundle manifest.
+        """
+        pth = Path(dirname) / f["file_name"]
+        part = self._part_path(pth)
+        offset = part.stat().st_size if part.exists() else 0
+
+        try:
+            response = self.client.get(
+                "bundle/{0}/{1}".format(self.task_id, f["file_id"]),
+                token,
+                headers={"Range": f"bytes={offset}-"} if offset else {},
+                allow_redirects=True,
+                stream=True,
+            )
+            with response:
+                # 416 means the partial file is already complete.
+                if response.status_code != 416:
+                    response.raise_for_status()
+                    # Start over if the server ignored the Range header.
+                    mode = "ab" if response.status_code == 206 else "wb"
+                    with open(part, mode) as con:
+                        for data in response.iter_content(chunk_size=chunk_size):
+                            con.write(data)
+        except requests.exceptions.RequestException as e:
+            raise DownloadError(f"The download of {f['file_name']} failed ({e}).")
+
+        _verify_file(part, f)
+        os.replace(part, pth)
+        return pth
+
+    def download(
+        self,
+        dirname: Union[Path, str],
+        token: str,
+        download_all=False,
+        workers: int = 4,
+        chunk_size: int = 1024 * 1024,
+    ) -> List[Path]:
         """Download all files associated with a task
 
         Args:
             dirname (Union[Path, str]): Directory to write data to.
             token (str): Token from Session object.
             download_all (bool, optional): Whether or not all associated metadata files should also be saved out. Defaults to False.
+            workers (int, optional): Number of files to download at once. Defaults to 4.
+            chunk_size (int, optional): Number of bytes to write at a time. Defaults to 1 MiB.
+
+        Returns:
+            List[Path]: Paths of the downloaded files.
 
         Raises:
             PendingTaskError: Raised if the task is still running.
+            DownloadError: Raised if a file can't be downloaded or doesn't match the bundle manifest.
         """
         if self.status_update(token) != "done":
             raise PendingTaskError()
 
-        response = requests.get(
-            "https://appeears.earthdatacloud.nasa.gov/api/bundle/{0}".format(
-                self.task_id
-            ),
-            headers={"Authorization": "Bearer {0}".format(token)},
+        response = self.client.get("bundle/{0}".format(self.task_id), token)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._write_file, f, dirname, token, chunk_size)
+                for f in self._bundle_files(response.json(), download_all)
+            ]
+            return [future.result() for future in as_completed(futures)]
+
+    async def download_async(
+        self,
+        dirname: Union[Path, str],
+        token: str,
+        client: AsyncAppEEARSClient,
+        download_all=False,
+    ) -> List[Path]:
+        """Download all files associated with a task concurrently using an asyncio client. See Task.download.
+
+        Args:
+            dirname (Union[Path, str]): Directory to write data to.
+            token (str): Token from Session object.
+            client (AsyncAppEEARSClient): The asyncio client to make the requests with.
+            download_all (bool, optional): Whether or not all associated metadata files should also be saved out. Defaults to False.
+
+        Returns:
+            List[Path]: Paths of the downloaded files.
+
+        Raises:
+            PendingTaskError: Raised if the task is still running.
+            DownloadError: Raised if a file can't be downloaded or doesn't match the bundle manifest.
+        """
+        if await self.status_update_async(token, client) != "done":
+            raise PendingTaskError()
+
+        response = await client.get("bundle/{0}".format(self.task_id), token)
+
+        async def write_file(f: Dict[str, Any]):
+            pth = Path(dirname) / f["file_name"]
+            part = self._part_path(pth)
+            await client.download(
+                "bundle/{0}/{1}".format(self.task_id, f["file_id"]), part, token
+            )
+            _verify_file(part, f)
+            os.replace(part, pth)
+            return pth
+
+        return await asyncio.gather(
+            *[write_file(f) for f in self._bundle_files(response.json(), download_all)]
         )
 
-        bundle_response = response.json()
+    @staticmethod
+    def _part_path(pth: Path) -> Path:
+        return pth.with_name(f"{pth.name}.part")
 
+    @staticmethod
+    def _bundle_files(
+        bundle_response: Dict[str, Any], download_all: bool
+    ) -> List[Dict[str, Any]]:
         if download_all:
-            for f in bundle_response["files"]:
-                self._write_file(f, dirname, token)
-        else:
-            f_list = [x for x in bundle_response["files"] if x["file_type"] == "csv"]
-            for f in f_list:
-                self._write_file(f, dirname, token)
+            return bundle_response["files"]
+        return [x for x in bundle_response["files"] if x["file_type"] == "csv"]
 
     def delete(self, token):
-        response = requests.delete(
-            "https://appeears.earthdatacloud.nasa.gov/api/task/{0}".format(
-                self.task_id
-            ),
-            headers={"Authorization": "Bearer {0}".format(token)},
-        )
+        response = self.client.delete("task/{0}".format(self.task_id), token)
         return response.status_code
 
 
@@ -241,20 +388,31 @@ class Submit(Task):
         Raises:
             InvalidRequestError: Raised if there are any errors in the request parameters.
         """
-        task = (
+        response = self.client.post("task", token, json=self._build_task())
+        self._set_launched(response.status_code, response.json())
+
+    async def launch_async(self, token: str, client: AsyncAppEEARSClient):
+        """Begin the task using an asyncio client. See Submit.launch.
+
+        Args:
+            token (str): Token from the session object.
+            client (AsyncAppEEARSClient): The asyncio client to make the request with.
+
+        Raises:
+            InvalidRequestError: Raised if there are any errors in the request parameters.
+        """
+        response = await client.post("task", token, json=self._build_task())
+        self._set_launched(response.status_code, response.json())
+
+    def _build_task(self) -> Dict[str, Any]:
+        return (
             self.build_point_task()
             if isinstance(self.geom, Point)
             else self.build_poly_task()
         )
 
-        response = requests.post(
-            "https://appeears.earthdatacloud.nasa.gov/api/task",
-            json=task,
-            headers={"Authorization": "Bearer {0}".format(token)},
-        )
-
-        task_response = response.json()
-        if response.status_code != 202:
+    def _set_launched(self, status_code: int, task_response: Dict[str, Any]):
+        if status_code != 202:
             raise InvalidRequestError(message=task_response["message"])
         self.task_id = task_response["task_id"]
         self.status = task_response["status"]
@@ -0,0 +1,141 @@
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+# Columns are named differently before and after to_db_format, but share a vocabulary.
+ALIASES = {"ID": "station", "product": "platform"}
+COLUMNS = ["station", "platform", "element", "units"]
+
+
+@dataclass
+class Vocabulary:
+    """Class to hold append-only category vocabularies for the repeated string columns of the pipeline.
+
+    Station, platform, element and units are carried as pandas categoricals. Because every frame
+    is encoded with the same categories, frames can be concatenated without falling back to object
+    columns. New values are only ever appended, so the code of a value never changes, and the
+    vocabulary can be saved next to an observation store so codes are stable between runs.
+
+    Attributes:
+        categories (Dict[str, List[str]]): The categories of each column.
+    """
+
+    categories: Dict[str, List[str]] = field(
+        default_factory=lambda: {k: [] for k in COLUMNS}
+    )
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def dtype(self, column: str) -> CategoricalDtype:
+        """Get the categorical dtype of a column.
+
+        Args:
+            column (str): The name of the column.
+
+        Returns:
+            CategoricalDtype: Categorical dtype with the current vocabulary of the column.
+        """
+        return CategoricalDtype(self.categories[ALIASES.get(column, column)])
+
+    def update(self, column: str, values: Iterable[str]):
+        """Append any unseen values to the vocabulary of a column.
+
+        Args:
+            column (str): The name of the column.
+            values (Iterable[str]): Values to add to the vocabulary.
+        """
+        with self._lock:
+            categories = self.categories.setdefault(ALIASES.get(column, column), [])
+            seen = set(categories)
+            categories.extend(sorted(x for x in set(values) if x not in seen))
+
+    def encode(self, dat: pd.DataFrame) -> pd.DataFrame:
+        """Convert the vocabulary columns of a DataFrame to categoricals using the shared categories.
+
+        Distinct values are found per column first, so the strings of each row are only hashed once.
+
+        Args:
+            dat (pd.DataFrame): DataFrame to encode.
+
+        Returns:
+            pd.DataFrame: DataFrame with categorical vocabulary columns.
+        """
+        cols = [x for x in dat.columns if ALIASES.get(x, x) in COLUMNS]
+        out = {}
+        for col in cols:
+            values = dat[col].astype("category")
+            self.update(col, values.cat.categories)
+            out[col] = self._recode(values, col)
+        return dat.assign(**out)
+
+    def _recode(self, values: pd.Series, column: str) -> pd.Series:
+        # astype() treats unordered categoricals with the same categories in a different order as
+        # the same dtype and doesn't recode them, so set the categories explicitly.
+        return values.cat.set_categories(self.categories[ALIASES.get(column, column)])
+
+    def concat(self, dfs: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """Concatenate DataFrames, keeping vocabulary columns categorical.
+
+        Frames encoded before the vocabulary grew are recoded to the final categories, which only
+        touches their categories rather than every row.
+
+        Args:
+            dfs (Iterable[pd.DataFrame]): DataFrames to concatenate.
+
+        Returns:
+            pd.DataFrame: The concatenated DataFrame.
+        """
+        dfs = [self.encode(x) for x in dfs]
+        dfs = [
+            x.assign(
+                **{
+                    c: self._recode(x[c], c)
+                    for c in x.columns
+                    if ALIASES.get(c, c) in COLUMNS
+                }
+            )
+            for x in dfs
+        ]
+        return pd.concat(dfs, axis=0, ignore_index=True)
+
+    def save(self, path: Union[str, Path]):
+        """Save the vocabulary to a .json file.
+
+        Args:
+            path (Union[str, Path]): Path to save the vocabulary to.
+        """
+        path = Path(path)
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as con:
+                json.dump(self.categories, con)
+            os.replace(tmp, path)
+
+    def load(self, path: Union[str, Path]):
+        """Append the categories saved in a .json file to the vocabulary.
+
+        Args:
+            path (Union[str, Path]): Path to the saved vocabulary.
+        """
+        path = Path(path)
+        if not path.exists():
+            return
+        with open(path) as con:
+            saved = json.load(con)
+
+        with self._lock:
+            for column, values in saved.items():
+                categories = self.categories.setdefault(column, [])
+                seen = set(categories)
+                categories.extend(x for x in values if x not in seen)
+
+
+VOCABULARY = Vocabulary()
@@ -1,8 +1,28 @@
-from .Clean import Cleaner, clean_all
+from .AsyncClient import AsyncAppEEARSClient
+from .Clean import Cleaner, clean_all, iter_clean_all, iter_clean_files
+from .Client import AppEEARSClient
 from .Geom import Point
+from .KeyIndex import KeyIndex
 from .Neo4jConn import MesonetSatelliteDB
-from .Product import Product
+from .Neo4jSeries import MesonetSeriesDB
+from .ParquetStore import ParquetObservationStore
+from .Pipeline import IngestPipeline, StageMetrics
+from .Product import Product, ProductCache
 from .Session import Session
-from .Task import InvalidRequestError, PendingTaskError, Submit, Task, list_task
-from .to_db_format import to_db_format
-from .update import operational_update, start_missing_tasks, wait_on_tasks
+from .Task import (
+    DownloadError,
+    InvalidRequestError,
+    PendingTaskError,
+    Submit,
+    Task,
+    list_task,
+)
+from .Vocabulary import VOCABULARY, Vocabulary
+from .admin_import import write_admin_import
+from .to_db_format import observation_key, to_db_format
+from .update import (
+    operational_update,
+    start_missing_tasks,
+    wait_on_tasks,
+    wait_on_tasks_async,
+)
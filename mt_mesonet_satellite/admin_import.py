@@ -0,0 +1,91 @@
+import tempfile
+from pathlib import Path
+from typing import Dict, Union
+
+import pandas as pd
+from loguru import logger
+
+from .Clean import iter_clean_all
+from .KeyIndex import KeyIndex
+from .to_db_format import to_db_format
+
+# Headers in the format expected by neo4j-admin import. Observations use the observation key as
+# their import ID and also store it as an integer id property.
+STATION_HEADER = ["name:ID(Station)"]
+OBSERVATION_HEADER = [
+    ":ID(Observation)",
+    "id:long",
+    "platform",
+    "element",
+    "value:double",
+    "units",
+]
+OBSERVES_HEADER = [":START_ID(Station)", ":END_ID(Observation)", "timestamp:long"]
+
+
+def write_admin_import(
+    dirname: Union[str, Path],
+    out_dir: Union[str, Path],
+    chunksize: int = 100000,
+    to_daily: bool = True,
+) -> Dict[str, Path]:
+    """Write node and relationship .csv files that can be loaded with neo4j-admin import.
+
+    AppEEARS files are cleaned and formatted one chunk at a time and appended to the output files,
+    so the whole dataset is never held in memory. The keys that have been written are tracked in a
+    temporary KeyIndex, so observations that appear in more than one file are only written once,
+    both as Observation nodes and as OBSERVES relationships.
+
+    Args:
+        dirname (Union[str, Path]): Directory containing the AppEEARS .csv files.
+        out_dir (Union[str, Path]): Directory to write the import files to, usually the Neo4j import directory.
+        chunksize (int, optional): Number of rows of each .csv to clean and format at a time. Defaults to 100000.
+        to_daily (bool, optional): Whether or not to aggregate sub-daily observations to daily means. Defaults to True.
+
+    Returns:
+        Dict[str, Path]: Paths of the 'stations', 'observations' and 'observes' files.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files = {
+        "stations": out_dir / "stations.csv",
+        "observations": out_dir / "observations.csv",
+        "observes": out_dir / "observes.csv",
+    }
+
+    stations = set()
+    n_rows = 0
+    with tempfile.TemporaryDirectory() as tmp_dir, open(
+        files["observations"], "w", newline=""
+    ) as obs_con, open(files["observes"], "w", newline="") as rel_con:
+        obs_con.write(",".join(OBSERVATION_HEADER) + "\n")
+        rel_con.write(",".join(OBSERVES_HEADER) + "\n")
+        written = KeyIndex(Path(tmp_dir) / "written.npy")
+
+        for cleaned in iter_clean_all(dirname, chunksize=chunksize, to_daily=to_daily):
+            dat = to_db_format(
+                f=cleaned,
+                neo4j_pth=None,
+                out_name=None,
+                write=False,
+                split=False,
+                key_index=written,
+            )
+            if dat.empty:
+                continue
+            written.add(dat["id"].to_numpy())
+            stations.update(dat["station"].unique())
+            dat[["id", "id", "platform", "element", "value", "units"]].to_csv(
+                obs_con, header=False, index=False
+            )
+            dat[["station", "id", "timestamp"]].to_csv(
+                rel_con, header=False, index=False
+            )
+            n_rows += len(dat)
+            logger.info(f"{n_rows} observations written to {out_dir}.")
+
+    pd.DataFrame({STATION_HEADER[0]: sorted(stations)}).to_csv(
+        files["stations"], index=False
+    )
+
+    return files
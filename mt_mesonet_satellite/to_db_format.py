@@ -1,11 +1,212 @@
 import argparse
+import hashlib
 from pathlib import Path
-from typing import Optional, Union
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 from loguru import logger
 
+from .KeyIndex import KeyIndex
+from .Vocabulary import VOCABULARY
+
+
+# Canonical element names for the layer names returned by AppEEARS.
+ELEMENT_NAMES = {
+    "ET_500m": "ET",
+    "Fpar_500m": "Fpar",
+    "GPP_gpp_mean": "GPP",
+    "Geophysical_Data_sm_rootzone": "sm_rootzone",
+    "Geophysical_Data_sm_rootzone_wetness": "sm_rootzone_wetness",
+    "Geophysical_Data_sm_surface": "sm_surface",
+    "Geophysical_Data_sm_surface_wetness": "sm_surface_wetness",
+    "Geophysical_Data_sm_rootzone_3h": "sm_rootzone_3h",
+    "Geophysical_Data_sm_rootzone_wetness_3h": "sm_rootzone_wetness_3h",
+    "Geophysical_Data_sm_surface_3h": "sm_surface_3h",
+    "Geophysical_Data_sm_surface_wetness_3h": "sm_surface_wetness_3h",
+    "Gpp_500m": "GPP",
+    "Lai_500m": "LAI",
+    "PET_500m": "PET",
+    "_500m_16_days_EVI": "EVI",
+    "_500m_16_days_NDVI": "NDVI",
+    "_500_m_16_days_EVI": "EVI",
+    "_500_m_16_days_NDVI": "NDVI",
+    "EVAPOTRANSPIRATION_ALEXI_ETdaily": "ET",
+    "EVAPOTRANSPIRATION_PT_JPL_ETdaily": "ET",
+}
+
+# Elements that are downloaded but not stored in the database.
+DROP_ELEMENTS = [
+    "Geophysical_Data_sm_rootzone_pctl",
+    "Geophysical_Data_sm_rootzone_pctl_3h",
+    "_500_m_16_days_EVI2",
+]
+
+# Units that are renamed regardless of platform or element.
+UNIT_NAMES = {"EVI": "unitless", "NDVI": "unitless"}
+
+# Scale factors and unit overrides applied to each (platform, element) after elements are renamed.
+# A platform of "*" applies to every platform without its own rule for that element, and units of
+# None keep the units reported by AppEEARS.
+TRANSFORM_RULES = [
+    # (platform, element, scale, units)
+    ("*", "GPP", 1000 / 8, "gCm^-2day^-1"),
+    ("SPL4CMDL.006", "GPP", 1, None),
+    ("*", "ET", 1 / 8, None),
+    ("ECO3ETALEXI.001", "ET", 1, None),
+    ("*", "PET", 1 / 8, None),
+]
+
+
+def _compile_rules(
+    platforms: pd.Index, elements: pd.Index, units: List[str]
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Compile TRANSFORM_RULES into lookup tables indexed by platform and element category codes.
+
+    Args:
+        platforms (pd.Index): The platform categories.
+        elements (pd.Index): The (renamed) element categories.
+        units (List[str]): The unit categories. Unit overrides are appended to these.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, List[str]]: A (platform x element) table of scale factors, a (platform x element) table of unit category codes (-1 where units are kept) and the extended unit categories.
+    """
+    scale = np.ones((len(platforms), len(elements)), dtype=np.float64)
+    unit_codes = np.full((len(platforms), len(elements)), -1, dtype=np.int64)
+    units = list(units)
+
+    # Apply the wildcard rules first so platform specific rules take precedence.
+    for platform, element, factor, unit in sorted(
+        TRANSFORM_RULES, key=lambda x: x[0] != "*"
+    ):
+        if element not in elements:
+            continue
+        col = elements.get_loc(element)
+        if platform == "*":
+            rows = slice(None)
+        elif platform in platforms:
+            rows = platforms.get_loc(platform)
+        else:
+            continue
+
+        scale[rows, col] = factor
+        if unit is None:
+            unit_codes[rows, col] = -1
+        else:
+            if unit not in units:
+                units.append(unit)
+            unit_codes[rows, col] = units.index(unit)
+
+    return scale, unit_codes, units
+
+
+def _transform(dat: pd.DataFrame) -> pd.DataFrame:
+    """Rename elements and units and apply scale factors in a single vectorized pass.
+
+    Distinct platforms, elements and units are resolved once through the rule tables, and each
+    row then looks its result up by category code.
+
+    Args:
+        dat (pd.DataFrame): Cleaned data with station, timestamp, element, value, platform and units columns.
+
+    Returns:
+        pd.DataFrame: The transformed data.
+    """
+    element = dat["element"].astype("category")
+    element_codes, elements = pd.factorize(
+        pd.Index([ELEMENT_NAMES.get(x, x) for x in element.cat.categories])
+    )
+    element_codes = element_codes[element.cat.codes.to_numpy()]
+
+    keep = ~elements.isin(DROP_ELEMENTS)[element_codes]
+    dat = dat[keep]
+    element_codes = element_codes[keep]
+
+    platform = dat["platform"].astype("category")
+    platform_codes = platform.cat.codes.to_numpy()
+
+    # Missing units are stored as 'unitless', which is the last unit category.
+    raw_units = dat["units"].astype("category")
+    units = [UNIT_NAMES.get(x, x) for x in raw_units.cat.categories] + ["unitless"]
+    unit_codes = raw_units.cat.codes.to_numpy()
+    unit_codes = np.where(unit_codes < 0, len(units) - 1, unit_codes)
+
+    scale, unit_overrides, units = _compile_rules(
+        platform.cat.categories, elements, units
+    )
+    unit_overrides = unit_overrides[platform_codes, element_codes]
+    unit_codes = np.where(unit_overrides >= 0, unit_overrides, unit_codes)
+    # Renames can map several units to the same name, so deduplicate the short list of units and
+    # remap the codes rather than hashing every row's unit string.
+    remap, units = pd.factorize(pd.Index(units))
+    unit_codes = remap[unit_codes]
+
+    value = dat["value"].fillna(-9999).to_numpy() * scale[platform_codes, element_codes]
+
+    return pd.DataFrame(
+        {
+            "station": dat["station"].array,
+            "timestamp": dat["timestamp"].to_numpy(),
+            "element": pd.Categorical.from_codes(element_codes, categories=elements),
+            "value": value,
+            "platform": platform.array,
+            "units": pd.Categorical.from_codes(
+                unit_codes, categories=units
+            ).remove_unused_categories(),
+        }
+    )
+
+
+def _hash_labels(labels: pd.Series) -> np.ndarray:
+    """Hash every distinct label in a column once and map the hashes back onto the rows.
+
+    Args:
+        labels (pd.Series): Column of strings to hash.
+
+    Returns:
+        np.ndarray: Array of unsigned 64-bit hashes, one per row.
+    """
+    codes, uniques = pd.factorize(labels)
+    hashes = np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(str(x).encode(), digest_size=8).digest(), "little"
+            )
+            for x in uniques
+        ],
+        dtype=np.uint64,
+    )
+    return hashes[codes]
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer used to combine hashes into a well distributed 64-bit value."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def observation_key(dat: pd.DataFrame) -> np.ndarray:
+    """Compute a deterministic 64-bit integer key for each observation.
+
+    The key is a hash of the station, timestamp, platform and element of an observation. Strings are
+    hashed once per distinct value with BLAKE2b, so keys are the same across runs, machines and
+    pandas versions.
+
+    Args:
+        dat (pd.DataFrame): DataFrame with station, timestamp, platform and element columns.
+
+    Returns:
+        np.ndarray: Array of signed 64-bit observation keys.
+    """
+    timestamp = dat["timestamp"].to_numpy().astype(np.int64).view(np.uint64)
+    key = _mix(timestamp)
+    for col in ["element", "platform", "station"]:
+        key = _mix(key ^ _hash_labels(dat[col]))
+    return key.view(np.int64)
+
 
 def to_db_format(
     f: Union[str, Path, pd.DataFrame],
@@ -13,13 +214,20 @@ def to_db_format(
     out_name: Optional[str] = None,
     write=False,
     split=False,
+    key_index: Optional[KeyIndex] = None,
+    n_files: int = 8,
 ) -> pd.DataFrame:
     """Convert dates to unix timestamps, clean element names, and save data to neo4j import directory.
        for Ubuntu machines, the defaults is /var/lib/neo4j/import/
 
+    Element renames, unit overrides and scale factors are defined in the ELEMENT_NAMES, DROP_ELEMENTS,
+    UNIT_NAMES and TRANSFORM_RULES tables.
+
     Args:
         f (Union[str, Path]): Path to raw master_db.csv file.
         neo4j_pth (Union[str, Path], optional): Neo4j import directory location. Defaults to "/var/lib/neo4j/import/".
+        key_index (Optional[KeyIndex], optional): Index of observation keys that are already stored. If provided, these observations are dropped. Defaults to None.
+        n_files (int, optional): Number of files to split the data into when split is True. Each station is written to a single file, so the files can be loaded concurrently with MesonetSatelliteDB.init_db. Defaults to 8.
     """
 
     dat = pd.read_csv(f) if not isinstance(f, pd.DataFrame) else f
@@ -31,77 +239,22 @@ def to_db_format(
         columns={"ID": "station", "Date": "timestamp", "product": "platform"}
     )
 
-    dat = dat.replace(
-        {
-            "element": {
-                "ET_500m": "ET",
-                "Fpar_500m": "Fpar",
-                "GPP_gpp_mean": "GPP",
-                "Geophysical_Data_sm_rootzone": "sm_rootzone",
-                "Geophysical_Data_sm_rootzone_wetness": "sm_rootzone_wetness",
-                "Geophysical_Data_sm_surface": "sm_surface",
-                "Geophysical_Data_sm_surface_wetness": "sm_surface_wetness",
-                "Gpp_500m": "GPP",
-                "Lai_500m": "LAI",
-                "PET_500m": "PET",
-                "_500m_16_days_EVI": "EVI",
-                "_500m_16_days_NDVI": "NDVI",
-                "_500_m_16_days_EVI": "EVI",
-                "_500_m_16_days_NDVI": "NDVI",
-                "EVAPOTRANSPIRATION_ALEXI_ETdaily": "ET",
-                "EVAPOTRANSPIRATION_PT_JPL_ETdaily": "ET",
-            }
-        }
-    )
-    dat = dat.assign(
-        id=dat.station
-        + "_"
-        + dat.timestamp.astype(str)
-        + "_"
-        + dat.platform
-        + "_"
-        + dat.element
-    )
-    dat = dat.assign(units=dat.units.fillna("unitless"))
-    dat = dat.assign(value=dat.value.fillna(-9999))
-    dat = dat.assign(
-        units=np.where(
-            (dat.units == "EVI") | (dat.units == "NDVI"), "unitless", dat.units
-        )
-    )
-    dat = dat.assign(
-        value=np.where(
-            (dat.platform != "SPL4CMDL.006") & (dat.element == "GPP"),
-            (dat.value * 1000) / 8,
-            dat.value,
-        )
-    )
-    dat = dat.assign(
-        value=np.where(
-            (dat.element == "ET") & (dat.platform != "ECO3ETALEXI.001"),
-            dat.value / 8,
-            dat.value,
-        )
-    )
-    dat = dat.assign(value=np.where(dat.element == "PET", dat.value / 8, dat.value))
-    dat = dat.assign(
-        units=np.where(
-            (dat.platform != "SPL4CMDL.006") & (dat.element == "GPP"),
-            "gCm^-2day^-1",
-            dat.units,
-        )
-    )
-
-    dat = dat[dat["element"] != "Geophysical_Data_sm_rootzone_pctl"]
-    dat = dat[dat["element"] != "_500_m_16_days_EVI2"]
+    dat = _transform(dat)
+    dat = VOCABULARY.encode(dat)
+    dat = dat.assign(id=observation_key(dat))
 
-    dat = dat.drop_duplicates()
+    # Observations are identified by their key, so there's no need to hash every column.
+    dat = dat.drop_duplicates(subset="id")
+    if key_index is not None:
+        known = key_index.contains(dat["id"].to_numpy())
+        logger.info(f"Skipping {known.sum()} observations that are already stored.")
+        dat = dat[~known]
     dat = dat.reset_index(drop=True)
     logger.info("Data successfully reformatted.")
     if write:
         if split:
             out_name = Path(f).stem if not out_name else out_name
-            groups = dat.groupby(np.arange(len(dat.index)) // 5000)
+            groups = dat.groupby(dat["station"].cat.codes.to_numpy() % n_files)
             for (num, tmp) in groups:
                 tmp_name = f"{out_name}_{num}.csv"
                 tmp.to_csv(Path(neo4j_pth) / tmp_name, index=False)
@@ -146,7 +299,7 @@ if __name__ == "__main__":
         "--split",
         dest="split",
         action="store_true",
-        help="Split data into smaller subsets.",
+        help="Split data into files that don't share stations.",
     )
     parser.add_argument(
         "--no-split",
@@ -1,19 +1,26 @@
+import asyncio
 import datetime as dt
+import random
 import re
 import tempfile
 import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import pandas as pd
 from loguru import logger
 
-from .Clean import clean_all
+from .AsyncClient import AsyncAppEEARSClient
+from .Clean import iter_clean_all
 from .Geom import Point
+from .KeyIndex import KeyIndex
 from .Neo4jConn import MesonetSatelliteDB
+from .ParquetStore import ParquetObservationStore
+from .Pipeline import IngestPipeline, post_formatted
 from .Product import Product
 from .Session import Session
-from .Task import PendingTaskError, Submit
+from .Task import DownloadError, PendingTaskError, Submit, list_task
 from .to_db_format import to_db_format
 
 RM_STRINGS = ["_pft", "_std_", "StdDev", "_EVI2", "_pctl"]
@@ -96,65 +103,306 @@ def start_missing_tasks(
     return tasks
 
 
+# Statuses of tasks that will never complete.
+FAILED_STATUSES = {"error", "expired", "deleted"}
+
+
+@dataclass
+class _PollSchedule:
+    """Per-task exponential backoff schedule used to decide when to poll running tasks.
+
+    Each task is first checked min_wait seconds after it is added. Every check that finds it still
+    running multiplies its interval by factor, up to max_wait. Intervals are randomly stretched
+    or shrunk by up to jitter so that checks don't line up. A task whose download fails is checked
+    again after min_wait, until it has failed max_failures times.
+    """
+
+    min_wait: float
+    max_wait: float
+    factor: float
+    jitter: float
+    max_failures: int = 3
+    intervals: Dict[str, float] = field(default_factory=dict)
+    due: Dict[str, float] = field(default_factory=dict)
+    failures: Dict[str, int] = field(default_factory=dict)
+
+    def _schedule(self, task_id: str, interval: float):
+        self.intervals[task_id] = interval
+        jitter = random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.due[task_id] = time.monotonic() + interval * jitter
+
+    def add(self, task_id: str):
+        self._schedule(task_id, self.min_wait)
+
+    def backoff(self, task_id: str):
+        interval = min(self.intervals[task_id] * self.factor, self.max_wait)
+        self._schedule(task_id, interval)
+
+    def retry(self, task_id: str) -> bool:
+        """Reschedule a task whose download failed. Returns False if it has failed too often."""
+        self.failures[task_id] = self.failures.get(task_id, 0) + 1
+        if self.failures[task_id] >= self.max_failures:
+            return False
+        self.add(task_id)
+        return True
+
+    def remove(self, task_id: str):
+        self.intervals.pop(task_id, None)
+        self.due.pop(task_id, None)
+
+    def is_due(self, task_id: str) -> bool:
+        return self.due[task_id] <= time.monotonic()
+
+    def seconds_until_due(self) -> float:
+        return max(0, min(self.due.values()) - time.monotonic())
+
+
+def _task_statuses(listing: Any) -> Dict[str, str]:
+    """Get the status of each task from a list_task response.
+
+    Args:
+        listing (Any): Response of the AppEEARS /task endpoint.
+
+    Returns:
+        Dict[str, str]: Mapping of task id to status.
+    """
+    if not isinstance(listing, list):
+        logger.warning(f"Unable to list tasks: {listing}")
+        return {}
+    return {x["task_id"]: x.get("status", "pending") for x in listing}
+
+
 @logger.catch
 def wait_on_tasks(
     tasks: List[Submit],
     session: Session,
     dirname: Union[str, Path],
     wait: int = 300,
+    min_wait: int = 30,
+    backoff: float = 2,
+    jitter: float = 0.1,
+    max_failures: int = 3,
+    on_download: Optional[Callable[[List[Path]], None]] = None,
 ) -> None:
-    """Wait until all tasks are completed and download the data once they are.
+    """Wait until all tasks are completed and download the data as soon as each one is.
+
+    Each round makes a single list_task request for the status of every task, and every task that
+    has completed is downloaded straight away. Rounds are scheduled by a per-task exponential
+    backoff, so a task that finishes quickly is picked up quickly and long running tasks are
+    checked less and less often.
 
     Args:
         tasks (List[Submit]): A list of running tasks.
         session (Session): Session object with login credentials.
         dirname (Union[str, Path]): Directory to save results out to.
-        wait (int, optional): How long to wait before trying to download data again. Defaults to 300.
+        wait (int, optional): Maximum number of seconds between checks of a task. Defaults to 300.
+        min_wait (int, optional): Number of seconds before the first check of a task. Defaults to 30.
+        backoff (float, optional): Factor to grow the time between checks of a running task by. Defaults to 2.
+        jitter (float, optional): Fraction the time between checks is randomly varied by. Defaults to 0.1.
+        max_failures (int, optional): Number of failed downloads after which a task is given up on. Defaults to 3.
+        on_download (Optional[Callable[[List[Path]], None]], optional): Called with the files of each task as soon as it is downloaded, e.g. IngestPipeline.submit. Defaults to None.
     """
     dirname = Path(dirname)
-
-    if not Path(dirname).exists():
-        dirname.mkdir(exist_ok=False)
-    time.sleep(wait)
+    dirname.mkdir(parents=True, exist_ok=True)
 
     tasks = {x.task_id: x for x in tasks}
-    while True:
-        to_pop = []
-        for k, task in tasks.items():
-            try:
-                task.download(dirname, session.token, False)
-                to_pop.append(k)
-                logger.info(f"Task {k} has completed and is downloaded.")
-            except PendingTaskError:
-                logger.warning(f"{k} is still running...")
-
-        for k in to_pop:
+    schedule = _PollSchedule(min_wait, wait, backoff, jitter, max_failures)
+    for k in tasks:
+        schedule.add(k)
+
+    while tasks:
+        time.sleep(schedule.seconds_until_due())
+        statuses = _task_statuses(list_task(session.token))
+
+        for k in list(tasks):
+            status = statuses.get(k, "pending")
+            if status == "done":
+                try:
+                    files = tasks[k].download(dirname, session.token, False)
+                except PendingTaskError as e:
+                    logger.warning(f"{e} Retrying {k}.")
+                    schedule.add(k)
+                    continue
+                except DownloadError as e:
+                    if schedule.retry(k):
+                        logger.warning(f"{e} Retrying {k}.")
+                        continue
+                    logger.error(
+                        f"{e} Giving up on {k} after {max_failures} failed downloads."
+                    )
+                else:
+                    logger.info(f"Task {k} has completed and is downloaded.")
+                    if on_download is not None:
+                        on_download(files)
+            elif status in FAILED_STATUSES:
+                logger.error(f"Task {k} finished with status '{status}'.")
+            else:
+                if schedule.is_due(k):
+                    schedule.backoff(k)
+                continue
             tasks.pop(k)
+            schedule.remove(k)
+
+        if tasks:
+            logger.info(
+                f"{len(tasks)} tasks are still running. Checking again in {schedule.seconds_until_due():.0f} seconds..."
+            )
+
+
+async def wait_on_tasks_async(
+    tasks: List[Submit],
+    session: Session,
+    dirname: Union[str, Path],
+    wait: int = 300,
+    min_wait: int = 30,
+    backoff: float = 2,
+    jitter: float = 0.1,
+    max_concurrency: int = 16,
+    max_failures: int = 3,
+    on_download: Optional[Callable[[List[Path]], None]] = None,
+) -> None:
+    """Wait until all tasks are completed, downloading completed tasks concurrently.
+
+    Tasks are polled like in wait_on_tasks, but the tasks found to be complete in a round are
+    downloaded at the same time.
+
+    Args:
+        tasks (List[Submit]): A list of running tasks.
+        session (Session): Session object with login credentials.
+        dirname (Union[str, Path]): Directory to save results out to.
+        wait (int, optional): Maximum number of seconds between checks of a task. Defaults to 300.
+        min_wait (int, optional): Number of seconds before the first check of a task. Defaults to 30.
+        backoff (float, optional): Factor to grow the time between checks of a running task by. Defaults to 2.
+        jitter (float, optional): Fraction the time between checks is randomly varied by. Defaults to 0.1.
+        max_concurrency (int, optional): Maximum number of requests in flight at once. Defaults to 16.
+        max_failures (int, optional): Number of failed downloads after which a task is given up on. Defaults to 3.
+        on_download (Optional[Callable[[List[Path]], None]], optional): Called with the files of each task as soon as it is downloaded. It is run in a worker thread, so it may block. Defaults to None.
+    """
+    dirname = Path(dirname)
+    dirname.mkdir(parents=True, exist_ok=True)
+
+    async def download(task: Submit):
+        try:
+            files = await task.download_async(dirname, session.token, client)
+        except PendingTaskError as e:
+            logger.warning(f"{e} Retrying {task.task_id}.")
+            schedule.add(task.task_id)
+            return None
+        except DownloadError as e:
+            if schedule.retry(task.task_id):
+                logger.warning(f"{e} Retrying {task.task_id}.")
+                return None
+            logger.error(
+                f"{e} Giving up on {task.task_id} after {max_failures} failed downloads."
+            )
+            return task.task_id
+        logger.info(f"Task {task.task_id} has completed and is downloaded.")
+        if on_download is not None:
+            await asyncio.get_running_loop().run_in_executor(None, on_download, files)
+        return task.task_id
 
-        if len(tasks) == 0:
-            break
+    tasks = {x.task_id: x for x in tasks}
+    schedule = _PollSchedule(min_wait, wait, backoff, jitter, max_failures)
+    for k in tasks:
+        schedule.add(k)
+
+    async with AsyncAppEEARSClient(max_concurrency=max_concurrency) as client:
+        while tasks:
+            await asyncio.sleep(schedule.seconds_until_due())
+            response = await client.get("task", session.token)
+            statuses = _task_statuses(response.json())
+
+            completed = []
+            for k in list(tasks):
+                status = statuses.get(k, "pending")
+                if status == "done":
+                    completed.append(tasks[k])
+                elif status in FAILED_STATUSES:
+                    logger.error(f"Task {k} finished with status '{status}'.")
+                    tasks.pop(k)
+                    schedule.remove(k)
+                elif schedule.is_due(k):
+                    schedule.backoff(k)
 
-        logger.info(f"Waiting {wait} seconds to try again...")
-        time.sleep(wait)
+            for k in await asyncio.gather(*[download(x) for x in completed]):
+                if k is not None:
+                    tasks.pop(k)
+                    schedule.remove(k)
+
+            if tasks:
+                logger.info(
+                    f"{len(tasks)} tasks are still running. Checking again in {schedule.seconds_until_due():.0f} seconds..."
+                )
 
 
 @logger.catch
-def update_db(dirname: Union[Path, str], conn=MesonetSatelliteDB):
+def update_db(
+    dirname: Union[Path, str],
+    conn: Union[MesonetSatelliteDB, ParquetObservationStore],
+    workers: Optional[int] = None,
+    chunksize: int = 100000,
+    to_daily: bool = True,
+    key_index: Optional[KeyIndex] = None,
+):
+    """Clean and format downloaded AppEEARS data and write it to the database.
 
-    logger.info("Starting upload to Neo4j DB.")
-    cleaned = clean_all(dirname, False)
-    formatted = to_db_format(
-        f=cleaned, neo4j_pth=None, out_name=None, write=False, split=False
-    )
-    formatted.reset_index(drop=True, inplace=True)
-    conn.post(formatted)
-    logger.info("Upload to Neo4j DB complete.")
+    Args:
+        dirname (Union[Path, str]): Directory with the downloaded AppEEARS .csv files.
+        conn (Union[MesonetSatelliteDB, ParquetObservationStore]): The observation store to write to.
+        workers (Optional[int], optional): Number of threads used to write to a Neo4j database. If None, the number of CPUs is used. Defaults to None.
+        chunksize (int, optional): Number of rows of each .csv to clean, format and post at a time. Defaults to 100000.
+        to_daily (bool, optional): Whether or not to aggregate sub-daily observations to daily means. If False, sub-daily products are stored at their native resolution. Defaults to True.
+        key_index (Optional[KeyIndex], optional): Index of observation keys that are already stored. Known observations are skipped and new ones are added to the index once they are posted. Defaults to None.
+    """
+    logger.info("Starting upload to observation store.")
+    try:
+        # Clean, format and post the data in chunks so memory doesn't grow with the size of the download.
+        for cleaned in iter_clean_all(
+            dirname, chunksize=chunksize, to_daily=to_daily
+        ):
+            formatted = to_db_format(
+                f=cleaned,
+                neo4j_pth=None,
+                out_name=None,
+                write=False,
+                split=False,
+                key_index=key_index,
+            )
+            if formatted.empty:
+                continue
+            formatted.reset_index(drop=True, inplace=True)
+            post_formatted(conn, formatted, workers, key_index)
+    finally:
+        # Save the keys that were posted, even if the update failed part way.
+        if key_index is not None:
+            key_index.flush()
+    logger.info("Upload to observation store complete.")
 
 
 @logger.catch
-def operational_update(conn, session, backfill: bool=False, stations: Optional[List[str]]=None):
+def operational_update(
+    conn,
+    session,
+    backfill: bool = False,
+    stations: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    to_daily: bool = True,
+    key_index: Optional[KeyIndex] = None,
+):
 
     with tempfile.TemporaryDirectory() as dirname:
         tasks = start_missing_tasks(conn=conn, session=session, start_now=True, backfill=backfill, stations=stations)
-        wait_on_tasks(tasks=tasks, session=session, dirname=dirname, wait=3600)
-        update_db(dirname=dirname, conn=conn)
+        # Each task's files are cleaned and stored in the background as soon as it is downloaded,
+        # while the remaining tasks keep running on AppEEARS.
+        logger.info("Starting upload to observation store.")
+        with IngestPipeline(
+            conn, workers=workers, to_daily=to_daily, key_index=key_index
+        ) as pipeline:
+            wait_on_tasks(
+                tasks=tasks,
+                session=session,
+                dirname=dirname,
+                wait=3600,
+                on_download=pipeline.submit,
+            )
+        logger.info("Upload to observation store complete.")
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from mt_mesonet_satellite import AppEEARSClient, AsyncAppEEARSClient
+from mt_mesonet_satellite.Product import PRODUCT_CACHE
+
+DATA = Path(__file__).parent / "data"
+
+
+class FakeAppEEARS:
+    """Local stand-in for the AppEEARS API that replays canned responses.
+
+    Responses registered with respond are returned in order for each method and path, and the last
+    one is repeated. Every request is recorded along with the client port it arrived on, so tests
+    can check how many connections were opened.
+
+    Attributes:
+        url (str): Base URL of the server.
+        delay (float): Seconds to wait before answering each request. Defaults to 0.
+        ranges (bool): Whether a 'bytes=N-' Range header is honoured for file bodies. Defaults to True.
+        requests (List[Dict]): The method, path, headers and client port of every request.
+        peak_in_flight (int): Largest number of requests that were being answered at once.
+    """
+
+    def __init__(self):
+        self.url = None
+        self.delay = 0
+        self.ranges = True
+        self.requests = []
+        self.peak_in_flight = 0
+        self._in_flight = 0
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def respond(self, method, path, *responses):
+        """Register responses to a request, each a (status, body) or (status, body, headers) tuple.
+
+        Lists and dicts are sent as JSON.
+        """
+        self._responses[(method, path)] = list(responses)
+
+    def bundle(self, task_id, files):
+        """Serve a completed task whose bundle holds files, a dict of file names and contents.
+
+        Returns:
+            List[Dict]: The bundle manifest.
+        """
+        manifest = [
+            {
+                "file_id": f"{task_id}-{i}",
+                "file_name": name,
+                "file_type": name.rsplit(".", 1)[-1],
+                "file_size": len(body),
+                "sha256": hashlib.sha256(body).hexdigest(),
+            }
+            for i, (name, body) in enumerate(files.items())
+        ]
+        self.respond("GET", f"status/{task_id}", (200, {"status": "done"}))
+        self.respond("GET", f"bundle/{task_id}", (200, {"files": manifest}))
+        for f, body in zip(manifest, files.values()):
+            self.respond("GET", f"bundle/{task_id}/{f['file_id']}", (200, body))
+        return manifest
+
+    def count(self, method, path):
+        return sum(1 for x in self.requests if (x["method"], x["path"]) == (method, path))
+
+    @property
+    def ports(self):
+        return {x["port"] for x in self.requests}
+
+    def _next(self, method, path):
+        with self._lock:
+            responses = self._responses.get((method, path))
+            if not responses:
+                return 404, b"{}", {}
+            response = responses.pop(0) if len(responses) > 1 else responses[0]
+        status, body, *headers = response
+        return status, body, headers[0] if headers else {}
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                path = self.path.lstrip("/")
+                with fake._lock:
+                    fake.requests.append(
+                        {
+                            "method": self.command,
+                            "path": path,
+                            "headers": dict(self.headers),
+                            "port": self.client_address[1],
+                        }
+                    )
+                    fake._in_flight += 1
+                    fake.peak_in_flight = max(fake.peak_in_flight, fake._in_flight)
+                try:
+                    time.sleep(fake.delay)
+                    status, body, headers = fake._next(self.command, path)
+                    if isinstance(body, (dict, list)):
+                        body = json.dumps(body).encode()
+                    elif status == 200 and fake.ranges and self.headers.get("Range"):
+                        start = int(re.match(r"bytes=(\d+)-", self.headers["Range"])[1])
+                        status = 206 if start < len(body) else 416
+                        body = body[start:]
+                    self.send_response(status)
+                    for k, v in headers.items():
+                        self.send_header(k, v)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with fake._lock:
+                        fake._in_flight -= 1
+
+            do_GET = do_POST = do_DELETE = _handle
+
+        return Handler
+
+
+@pytest.fixture
+def appeears():
+    fake = FakeAppEEARS()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), fake.handler())
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    fake.url = f"http://127.0.0.1:{server.server_port}"
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(appeears):
+    """AppEEARSClient that talks to the fake AppEEARS server without waiting between retries."""
+    client = AppEEARSClient(base_url=appeears.url, backoff_factor=0)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def run_async(appeears):
+    """Run fn(client) with an AsyncAppEEARSClient that talks to the fake AppEEARS server.
+
+    pytest-asyncio isn't a dependency, so each call runs its own event loop. Keyword arguments
+    are passed to AsyncAppEEARSClient.
+    """
+
+    def run(fn, **kwargs):
+        async def main():
+            async with AsyncAppEEARSClient(
+                base_url=appeears.url, backoff_factor=0, **kwargs
+            ) as client:
+                return await fn(client)
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def data_dir() -> Path:
+    return DATA
+
+
+@pytest.fixture
+def product_metadata(monkeypatch):
+    """Serve AppEEARS product metadata from tests/data/products.json instead of the API."""
+    with open(DATA / "products.json") as con:
+        products = json.load(con)
+    monkeypatch.setattr(PRODUCT_CACHE, "get", lambda product: products[product])
+    return products
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from mt_mesonet_satellite import InvalidRequestError, PendingTaskError, Submit, Task
+from mt_mesonet_satellite.Geom import Point
+
+CONTENT = {"a.csv": b"ID,Date\nACEABSAR,2020-01-01\n", "b.csv": b"ID,Date\n"}
+
+
+def test_concurrency_is_capped(appeears, run_async):
+    appeears.delay = 0.05
+    appeears.respond("GET", "status/abc", (200, {"status": "processing"}))
+    tasks = [Task("abc") for _ in range(20)]
+
+    statuses = run_async(
+        lambda client: asyncio.gather(
+            *[x.status_update_async("token", client) for x in tasks]
+        ),
+        max_concurrency=4,
+    )
+
+    assert statuses == ["processing"] * 20
+    assert 1 < appeears.peak_in_flight <= 4
+    assert len(appeears.ports) <= 4
+
+
+def test_download_async_writes_verified_files(appeears, run_async, tmp_path):
+    appeears.bundle("abc", {**CONTENT, "x.json": b"{}"})
+
+    files = run_async(
+        lambda client: Task("abc").download_async(tmp_path, "token", client)
+    )
+
+    assert sorted(x.name for x in files) == ["a.csv", "b.csv"]
+    for f in files:
+        assert f.read_bytes() == CONTENT[f.name]
+    assert sorted(x.name for x in tmp_path.iterdir()) == ["a.csv", "b.csv"]
+    assert appeears.requests[0]["headers"]["Authorization"] == "Bearer token"
+
+
+def test_download_async_of_running_task(appeears, run_async, tmp_path):
+    appeears.respond("GET", "status/abc", (200, {"status": "processing"}))
+
+    with pytest.raises(PendingTaskError):
+        run_async(lambda client: Task("abc").download_async(tmp_path, "token", client))
+    assert appeears.count("GET", "bundle/abc") == 0
+
+
+@pytest.fixture
+def submit():
+    return Submit(
+        name="test",
+        products=["MOD16A2GF.061"],
+        layers=["ET_500m"],
+        start_date="2020-01-01",
+        end_date="2020-12-31",
+        geom=Point(lats=[46.9], lons=[-114.0], ids=["ACEABSAR"]),
+    )
+
+
+def test_launch_async(appeears, run_async, submit):
+    appeears.respond("POST", "task", (202, {"task_id": "abc", "status": "pending"}))
+
+    run_async(lambda client: submit.launch_async("token", client))
+
+    assert (submit.task_id, submit.status) == ("abc", "pending")
+
+
+def test_launch_async_rejected(appeears, run_async, submit):
+    appeears.respond("POST", "task", (400, {"message": "Invalid layer."}))
+
+    with pytest.raises(InvalidRequestError, match="Invalid layer."):
+        run_async(lambda client: submit.launch_async("token", client))
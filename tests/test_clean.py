@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mt_mesonet_satellite import clean_all, iter_clean_all, to_db_format
+
+LABELS = ["ID", "Date", "element", "product", "units"]
+
+
+def _normalize(dat: pd.DataFrame) -> pd.DataFrame:
+    # Row order isn't part of the output format, so rows are compared in a fixed order.
+    dat = dat.astype({k: str for k in LABELS})
+    return dat.sort_values(["product", "element", "ID", "Date"]).reset_index(drop=True)
+
+
+@pytest.fixture
+def expected(data_dir) -> pd.DataFrame:
+    # Generated from the fixture files by the pivot_longer based Cleaner.
+    return pd.read_csv(data_dir / "cleaned.csv", dtype={"Date": str})
+
+
+def test_clean_all_matches_golden(data_dir, product_metadata, expected):
+    dat = clean_all(data_dir / "appeears")
+
+    assert list(dat.columns) == list(expected.columns)
+    # Sub-daily means are computed in a different order, so they only match up to rounding.
+    pd.testing.assert_frame_equal(
+        _normalize(dat), _normalize(expected), check_exact=False, rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 5])
+def test_iter_clean_all_matches_golden(
+    data_dir, product_metadata, expected, chunksize
+):
+    dat = pd.concat(list(iter_clean_all(data_dir / "appeears", chunksize=chunksize)))
+
+    pd.testing.assert_frame_equal(
+        _normalize(dat), _normalize(expected), check_exact=False, rtol=1e-12
+    )
+
+
+def test_native_subdaily_observations_have_their_own_keys(data_dir, product_metadata):
+    daily = clean_all(data_dir / "appeears")
+    native = clean_all(data_dir / "appeears", to_daily=False)
+    native = native[native["product"] == "SPL4SMGP.007"]
+
+    assert set(native["element"].unique()) == {
+        "Geophysical_Data_sm_rootzone_3h",
+        "Geophysical_Data_sm_surface_3h",
+    }
+    assert native.groupby(["ID", "element"], observed=True).size().eq(8 * 3).all()
+
+    daily, native = [
+        to_db_format(x, neo4j_pth=None, write=False) for x in [daily, native]
+    ]
+    assert set(native["element"].unique()) == {"sm_rootzone_3h", "sm_surface_3h"}
+    assert not np.isin(native["id"], daily["id"]).any()
@@ -0,0 +1,54 @@
+import pytest
+
+from mt_mesonet_satellite import AppEEARSClient, Task, list_task
+
+
+def test_connections_are_reused(appeears, client):
+    appeears.respond("GET", "task", (200, []))
+    appeears.respond("GET", "status/abc", (200, {"status": "processing"}))
+
+    for _ in range(10):
+        list_task("token", client)
+        Task("abc", client=client).status_update("token")
+
+    assert len(appeears.requests) == 20
+    assert len(appeears.ports) == 1
+
+
+def test_token_is_sent_as_bearer(appeears, client):
+    appeears.respond("GET", "status/abc", (200, {"status": "done"}))
+
+    assert Task("abc", client=client).status_update("token") == "done"
+    assert appeears.requests[0]["headers"]["Authorization"] == "Bearer token"
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 504])
+def test_get_is_retried_on_server_errors(appeears, client, status):
+    appeears.respond("GET", "task", (status, {}), (200, []))
+
+    assert client.get("task").status_code == 200
+    assert appeears.count("GET", "task") == 2
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+@pytest.mark.parametrize("status", [429, 503])
+def test_retry_after_is_honored_for_every_method(appeears, client, method, status):
+    appeears.respond(method, "task", (status, {}, {"Retry-After": "0"}), (200, {}))
+
+    assert client.request(method, "task").status_code == 200
+    assert appeears.count(method, "task") == 2
+
+
+def test_post_is_not_retried_without_retry_after(appeears, client):
+    appeears.respond("POST", "task", (503, {}), (200, {}))
+
+    assert client.post("task", json={}).status_code == 503
+    assert appeears.count("POST", "task") == 1
+
+
+def test_retries_give_up(appeears):
+    appeears.respond("GET", "task", (500, {}))
+    client = AppEEARSClient(base_url=appeears.url, retries=2, backoff_factor=0)
+
+    assert client.get("task").status_code == 500
+    assert appeears.count("GET", "task") == 3
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+
+from mt_mesonet_satellite import (
+    DownloadError,
+    Task,
+    wait_on_tasks,
+)
+from mt_mesonet_satellite.Client import CLIENT
+
+BODY = b"ID,Date,value\n" + b"ACEABSAR,2020-01-01,1\n" * 100
+
+
+@pytest.fixture(params=["sync", "async"])
+def download(request, client, run_async):
+    """Download a task with Task.download or Task.download_async."""
+    if request.param == "sync":
+        return lambda task_id, dirname: Task(task_id, client=client).download(
+            dirname, "token"
+        )
+    return lambda task_id, dirname: run_async(
+        lambda client: Task(task_id).download_async(dirname, "token", client)
+    )
+
+
+def test_download_resumes_part_file(appeears, download, tmp_path):
+    appeears.bundle("abc", {"a.csv": BODY})
+    (tmp_path / "a.csv.part").write_bytes(BODY[:100])
+
+    (pth,) = download("abc", tmp_path)
+
+    assert pth.read_bytes() == BODY
+    assert not (tmp_path / "a.csv.part").exists()
+    assert appeears.requests[-1]["headers"]["Range"] == "bytes=100-"
+
+
+def test_download_of_complete_part_file(appeears, download, tmp_path):
+    appeears.bundle("abc", {"a.csv": BODY})
+    (tmp_path / "a.csv.part").write_bytes(BODY)
+
+    (pth,) = download("abc", tmp_path)
+
+    assert pth.read_bytes() == BODY
+
+
+def test_download_restarts_if_range_is_ignored(appeears, download, tmp_path):
+    appeears.bundle("abc", {"a.csv": BODY})
+    appeears.ranges = False
+    (tmp_path / "a.csv.part").write_bytes(b"stale")
+
+    (pth,) = download("abc", tmp_path)
+
+    assert pth.read_bytes() == BODY
+
+
+def test_checksum_mismatch(appeears, download, tmp_path):
+    (f,) = appeears.bundle("abc", {"a.csv": BODY})
+    corrupt = BODY.replace(b"1", b"2")
+    appeears.respond("GET", f"bundle/abc/{f['file_id']}", (200, corrupt))
+
+    with pytest.raises(DownloadError, match="checksum"):
+        download("abc", tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_truncated_file_is_kept_to_resume(appeears, download, tmp_path):
+    (f,) = appeears.bundle("abc", {"a.csv": BODY})
+    appeears.respond("GET", f"bundle/abc/{f['file_id']}", (200, BODY[:100]))
+
+    with pytest.raises(DownloadError, match="bytes"):
+        download("abc", tmp_path)
+    assert (tmp_path / "a.csv.part").read_bytes() == BODY[:100]
+    assert not (tmp_path / "a.csv").exists()
+
+
+def test_failed_request(appeears, download, tmp_path):
+    (f,) = appeears.bundle("abc", {"a.csv": BODY})
+    appeears.respond("GET", f"bundle/abc/{f['file_id']}", (404, {}))
+
+    with pytest.raises(DownloadError):
+        download("abc", tmp_path)
+
+
+def test_wait_on_tasks_gives_up_after_max_failures(appeears, monkeypatch, tmp_path):
+    (f,) = appeears.bundle("abc", {"a.csv": BODY})
+    appeears.respond("GET", f"bundle/abc/{f['file_id']}", (404, {}))
+    appeears.respond("GET", "task", (200, [{"task_id": "abc", "status": "done"}]))
+    monkeypatch.setattr(CLIENT, "base_url", appeears.url)
+    downloaded = []
+
+    wait_on_tasks(
+        [Task("abc")],
+        SimpleNamespace(token="token"),
+        tmp_path,
+        min_wait=0,
+        wait=0,
+        jitter=0,
+        max_failures=3,
+        on_download=downloaded.append,
+    )
+
+    assert appeears.count("GET", f"bundle/abc/{f['file_id']}") == 3
+    assert downloaded == []
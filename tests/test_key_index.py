@@ -0,0 +1,55 @@
+import threading
+
+import numpy as np
+
+from mt_mesonet_satellite import KeyIndex
+
+
+def test_keys_are_saved_by_flush(tmp_path):
+    index = KeyIndex(tmp_path / "keys.npy")
+    index.add([3, 1, 2])
+    index.add([2, 5])
+
+    np.testing.assert_array_equal(index.contains([1, 4, 5]), [True, False, True])
+    assert len(KeyIndex(tmp_path / "keys.npy")) == 0
+
+    index.flush()
+
+    reloaded = KeyIndex(tmp_path / "keys.npy")
+    np.testing.assert_array_equal(reloaded.keys, [1, 2, 3, 5])
+    assert len(index) == 4
+
+
+def test_buffer_is_flushed_when_full(tmp_path):
+    index = KeyIndex(tmp_path / "keys.npy", flush_size=10)
+    for start in range(0, 100, 5):
+        index.add(np.arange(start, start + 5))
+
+    # The buffer is flushed once it is as large as the file, so the file at least doubles.
+    assert 50 <= len(KeyIndex(tmp_path / "keys.npy")) < 100
+    assert index.contains(np.arange(100)).all()
+
+
+def test_added_keys_stay_visible_to_other_threads(tmp_path):
+    # Checks run while another thread merges and flushes segments must always see earlier keys.
+    index = KeyIndex(tmp_path / "keys.npy", flush_size=64)
+    added = 0
+    done = threading.Event()
+    missing = []
+
+    def write():
+        nonlocal added
+        for start in range(0, 20_000, 16):
+            index.add(np.arange(start, start + 16))
+            added = start + 16
+        done.set()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    while not done.is_set():
+        known = np.arange(added)
+        missing.append(int((~index.contains(known)).sum()))
+    thread.join()
+
+    assert sum(missing) == 0
+    assert index.contains(np.arange(20_000)).all()
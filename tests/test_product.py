@@ -0,0 +1,70 @@
+import json
+import time
+
+import pytest
+
+from mt_mesonet_satellite import AppEEARSClient, InvalidRequestError, Product
+from mt_mesonet_satellite.Product import ProductCache
+
+PRODUCT = "MOD16A2.061"
+
+
+@pytest.fixture
+def layers(data_dir):
+    with open(data_dir / "products.json") as con:
+        return json.load(con)[PRODUCT]
+
+
+@pytest.fixture
+def cache(client, tmp_path):
+    return ProductCache(cache_dir=tmp_path, client=client)
+
+
+def _stale(cache, appeears, layers):
+    """Fill the cache, then age the entry past its ttl."""
+    appeears.respond("GET", f"product/{PRODUCT}", (200, layers, {"ETag": "v1"}))
+    cache.get(PRODUCT)
+    entry = cache._memo[PRODUCT]
+    entry["fetched"] = time.time() - cache.ttl - 1
+    cache._write(PRODUCT, entry)
+    appeears.requests.clear()
+
+
+def test_fresh_entries_are_not_requested(appeears, cache, layers, tmp_path):
+    appeears.respond("GET", f"product/{PRODUCT}", (200, layers, {"ETag": "v1"}))
+
+    assert cache.get(PRODUCT) == layers
+    assert ProductCache(cache_dir=tmp_path, client=cache.client).get(PRODUCT) == layers
+    assert appeears.count("GET", f"product/{PRODUCT}") == 1
+
+
+def test_stale_entries_are_revalidated(appeears, cache, layers):
+    _stale(cache, appeears, layers)
+    appeears.respond("GET", f"product/{PRODUCT}", (304, b""))
+
+    assert cache.get(PRODUCT) == layers
+    assert appeears.requests[0]["headers"]["If-None-Match"] == "v1"
+    assert time.time() - cache._memo[PRODUCT]["fetched"] < cache.ttl
+
+
+@pytest.mark.parametrize("status", [404, 503])
+def test_stale_entries_are_used_on_errors(appeears, cache, layers, status):
+    _stale(cache, appeears, layers)
+    appeears.respond("GET", f"product/{PRODUCT}", (status, {"message": "Down."}))
+
+    assert cache.get(PRODUCT) == layers
+
+
+def test_stale_entries_are_used_on_timeouts(appeears, cache, layers, tmp_path):
+    _stale(cache, appeears, layers)
+    appeears.delay = 0.5
+    client = AppEEARSClient(base_url=appeears.url, timeout=(1, 0.05), retries=0)
+
+    assert ProductCache(cache_dir=tmp_path, client=client).get(PRODUCT) == layers
+
+
+def test_errors_without_a_cached_entry(appeears, cache):
+    appeears.respond("GET", f"product/{PRODUCT}", (503, {"message": "Down."}))
+
+    with pytest.raises(InvalidRequestError, match="status 503"):
+        Product(PRODUCT, cache=cache)
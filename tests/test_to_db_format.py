@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mt_mesonet_satellite import clean_all, observation_key, to_db_format
+from mt_mesonet_satellite.to_db_format import ELEMENT_NAMES
+
+# Keys are stored in Neo4j, Parquet files and key indices, so they must never change. If
+# this test fails, every stored observation would be posted again under a new key.
+KEYS = pd.DataFrame(
+    [
+        ("aceabsar", 1640995200, "SPL4SMGP.007", "sm_surface", 2677558879627021431),
+        ("bozemans", 1640995200, "SPL4SMGP.007", "sm_surface", 8601731193056214627),
+        ("aceabsar", 1641686400, "MOD16A2.061", "ET", 725896656164410490),
+        ("aceabsar", 1640995200, "SPL4SMGP.007", "sm_surface_3h", 9042116992216006221),
+    ],
+    columns=["station", "timestamp", "platform", "element", "id"],
+)
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_observation_keys_are_stable(dtype):
+    dat = KEYS.astype({k: dtype for k in ["station", "platform", "element"]})
+
+    keys = observation_key(dat)
+
+    assert keys.dtype == np.int64
+    np.testing.assert_array_equal(keys, KEYS["id"].to_numpy())
+
+
+def test_observation_keys_depend_on_row_not_order():
+    keys = observation_key(KEYS.iloc[::-1])
+
+    np.testing.assert_array_equal(keys, KEYS["id"].to_numpy()[::-1])
+
+
+# (scale, units) of every (platform, element) in the fixtures.
+FIXTURE_RULES = {
+    ("MOD16A2.061", "ET"): (1 / 8, "kg/m^2/8day"),
+    ("MOD16A2.061", "PET"): (1 / 8, "kg/m^2/8day"),
+    ("SPL4SMGP.007", "sm_rootzone"): (1, "Geophysical_Data_sm_rootzone"),
+    ("SPL4SMGP.007", "sm_surface"): (1, "Geophysical_Data_sm_surface"),
+}
+
+
+def test_to_db_format_scales_and_renames_fixtures(data_dir, product_metadata):
+    cleaned = clean_all(data_dir / "appeears")
+
+    dat = to_db_format(cleaned, neo4j_pth=None, write=False)
+
+    assert len(dat) == len(cleaned)
+    for (platform, element), group in dat.groupby(
+        ["platform", "element"], observed=True
+    ):
+        scale, units = FIXTURE_RULES[(platform, element)]
+        raw = cleaned[
+            (cleaned["product"] == platform)
+            & (cleaned["element"].map(ELEMENT_NAMES) == element)
+        ]
+        np.testing.assert_allclose(
+            group["value"].to_numpy(), raw["value"].fillna(-9999).to_numpy() * scale
+        )
+        assert set(group["units"]) == {units}
+    assert set(zip(dat["platform"], dat["element"])) == set(FIXTURE_RULES)
+
+
+def test_to_db_format_rules():
+    dat = pd.DataFrame(
+        [
+            ("MOD17A2HGF.061", "Gpp_500m", 0.008, "kgC/m^2/8day"),
+            ("SPL4CMDL.006", "GPP_gpp_mean", 2.0, "g m-2 d-1"),
+            ("MOD16A2GF.061", "ET_500m", 16.0, "kg/m^2/8day"),
+            ("ECO3ETALEXI.001", "EVAPOTRANSPIRATION_ALEXI_ETdaily", 3.0, "mm"),
+            ("MOD13A1.061", "_500m_16_days_NDVI", 0.5, "NDVI"),
+            ("MOD15A2H.061", "Lai_500m", 1.5, None),
+            ("MOD13A1.061", "_500m_16_days_EVI", None, "EVI"),
+            ("SPL4SMGP.007", "Geophysical_Data_sm_rootzone_pctl", 50.0, "%"),
+            ("MOD13A1.061", "_500_m_16_days_EVI2", 0.3, "EVI2"),
+        ],
+        columns=["product", "element", "value", "units"],
+    ).assign(ID="aceabsar", Date="2022-01-01")
+
+    dat = to_db_format(dat, neo4j_pth=None, write=False)
+
+    columns = [dat[k] for k in ["platform", "element", "value", "units"]]
+    result = {(p, e): (v, u) for p, e, v, u in zip(*columns)}
+    assert result == {
+        ("MOD17A2HGF.061", "GPP"): (pytest.approx(1.0), "gCm^-2day^-1"),
+        ("SPL4CMDL.006", "GPP"): (2.0, "g m-2 d-1"),
+        ("MOD16A2GF.061", "ET"): (2.0, "kg/m^2/8day"),
+        ("ECO3ETALEXI.001", "ET"): (3.0, "mm"),
+        ("MOD13A1.061", "NDVI"): (0.5, "unitless"),
+        ("MOD15A2H.061", "LAI"): (1.5, "unitless"),
+        ("MOD13A1.061", "EVI"): (-9999, "unitless"),
+    }
@@ -5,13 +5,19 @@ import datetime as dt
 import os
 import sys
 from pathlib import Path
-from typing import List, NoReturn
+from typing import List, NoReturn, Union
 
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from loguru import logger
-from mt_mesonet_satellite import MesonetSatelliteDB, Session, operational_update
+from mt_mesonet_satellite import (
+    MesonetSatelliteDB,
+    ParquetObservationStore,
+    Session,
+    observation_key,
+    operational_update,
+)
 from neo4j.exceptions import ConfigurationError
 
 load_dotenv("/setup/.env")
@@ -48,50 +54,43 @@ ELEMENTS = [
 
 
 def backfill_collocated(
-    station: str, collocated: str, conn: MesonetSatelliteDB
+    station: str,
+    collocated: str,
+    conn: Union[MesonetSatelliteDB, ParquetObservationStore],
 ) -> NoReturn:
     """Backfill a collocated station with satellite data from the collocated station.
 
     Args:
         station (str): Name of the station to backfill.
         collocated (str): Name of the existing station with data in the database.
-        conn (MesonetSatelliteDB): Connection to the Neo4j database.
+        conn (Union[MesonetSatelliteDB, ParquetObservationStore]): The observation store to read from and write to.
 
     Returns:
-        NoReturn: Nothing is returned, data are written to the database.
+        NoReturn: Nothing is returned, data are written to the observation store.
     """
-    dfs = []
     now = round((dt.datetime.now() - dt.datetime(1970, 1, 1)).total_seconds())
 
     # Query all of the elements at a station.
-    for element in ELEMENTS:
-        print(element)
-        tmp = conn.query(collocated, 0, now, element)
-        dfs.append(tmp)
-
-    dat = pd.concat(dfs, axis=0)
+    dat = conn.query_many([collocated], ELEMENTS, 0, now)
 
     # Reformat results to match the format of the to_db_format function.
     dat = dat.rename(columns={"date": "timestamp"})
+    dat = dat.astype({"station": str, "platform": str, "element": str, "units": str})
     dat = dat[["station", "timestamp", "element", "value", "platform", "units"]]
     dat = dat.assign(units=dat.units.replace(r"^\s*$", "unitless", regex=True))
     dat = dat.assign(station=station)
-    dat = dat.assign(
-        id=dat.station
-        + "_"
-        + dat.timestamp.astype(str)
-        + "_"
-        + dat.platform
-        + "_"
-        + dat.element
-    )
+    dat = dat.assign(id=observation_key(dat))
     dat = dat.reset_index(drop=True)
 
     # Post data to database.
     conn.post(dat)
 
 
-def backfill_isolated(stations: List[str], session: Session, conn: MesonetSatelliteDB):
+def backfill_isolated(
+    stations: List[str],
+    session: Session,
+    conn: Union[MesonetSatelliteDB, ParquetObservationStore],
+):
     operational_update(conn=conn, session=session, backfill=True, stations=stations)
 
 
@@ -105,18 +104,28 @@ if __name__ == "__main__":
         help="The stations to backfill. If more than one station is being backfilled, separate names with a space.",
         required=True,
     )
+    parser.add_argument(
+        "-p",
+        "--parquet",
+        type=str,
+        default=os.getenv("ParquetStore"),
+        help="Directory of a Parquet observation store to backfill. If not provided, the Neo4j database is backfilled.",
+    )
     args = parser.parse_args()
     load_dotenv("./.env")
 
-    try:
-        conn = MesonetSatelliteDB(
-            uri=os.getenv("Neo4jURI"),
-            user=os.getenv("Neo4jUser"),
-            password=os.getenv("Neo4jPassword"),
-        )
-    except ConfigurationError as e:
-        logger.exception(e)
-        logger.exception("Unable to connect to Neo4j DB.")
+    if args.parquet:
+        conn = ParquetObservationStore(args.parquet)
+    else:
+        try:
+            conn = MesonetSatelliteDB(
+                uri=os.getenv("Neo4jURI"),
+                user=os.getenv("Neo4jUser"),
+                password=os.getenv("Neo4jPassword"),
+            )
+        except ConfigurationError as e:
+            logger.exception(e)
+            logger.exception("Unable to connect to Neo4j DB.")
 
     try:
         session = Session(dot_env=True)
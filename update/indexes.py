@@ -0,0 +1,34 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+from mt_mesonet_satellite import MesonetSatelliteDB
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Create or update the Neo4j indices and constraints."
+    )
+    parser.add_argument(
+        "-e", "--env", type=str, default=".env", help="Path to your .env file."
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report the db hits of the canned queries before and after creating the indices.",
+    )
+    args = parser.parse_args()
+    load_dotenv(args.env)
+
+    conn = MesonetSatelliteDB(
+        uri=os.getenv("Neo4jURI"),
+        user=os.getenv("Neo4jUser"),
+        password=os.getenv("Neo4jPassword"),
+    )
+
+    try:
+        report = conn.init_db_indices(profile=args.profile)
+        if report is not None:
+            print(report.to_string(index=False))
+    finally:
+        conn.close()
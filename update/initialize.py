@@ -75,7 +75,7 @@ if __name__ == "__main__":
         # checking if the task is complete.
         wait_on_tasks(tasks=viirs, session=session, dirname=dirname, wait=3600)
         # Clean the processed data.
-        cleaned = clean_all(dirname, False)
+        cleaned = clean_all(dirname, False, workers=os.cpu_count() or 1)
 
         # On linux OS, there can be permissions errors with the linked Docker volumes.
         # If this occurs, manually post the entries to the db (This is slower than using
@@ -90,7 +90,7 @@ if __name__ == "__main__":
             )
 
             # Upload the data to the database using the Neo4j CSV reader.
-            conn.init_db(dirname)
+            conn.init_db(args.neo4jpth)
         except (FileNotFoundError, PermissionError) as e:
             formatted = to_db_format(
                 f=cleaned, neo4j_pth=None, out_name=None, write=False, split=False
@@ -0,0 +1,37 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+from mt_mesonet_satellite import MesonetSatelliteDB, ParquetObservationStore
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Rewrite string observation ids as integer observation keys."
+    )
+    parser.add_argument(
+        "-e", "--env", type=str, default=".env", help="Path to your .env file."
+    )
+    parser.add_argument(
+        "-p",
+        "--parquet",
+        type=str,
+        default=None,
+        help="Directory of a Parquet observation store to migrate. If not provided, the Neo4j database is migrated.",
+    )
+    args = parser.parse_args()
+    load_dotenv(args.env)
+
+    if args.parquet:
+        conn = ParquetObservationStore(args.parquet)
+    else:
+        conn = MesonetSatelliteDB(
+            uri=os.getenv("Neo4jURI"),
+            user=os.getenv("Neo4jUser"),
+            password=os.getenv("Neo4jPassword"),
+        )
+
+    try:
+        conn.migrate_observation_ids()
+    finally:
+        conn.close()
@@ -0,0 +1,39 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+from mt_mesonet_satellite import MesonetSatelliteDB, MesonetSeriesDB
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Copy observations from Observation nodes into yearly Series nodes."
+    )
+    parser.add_argument(
+        "-e", "--env", type=str, default=".env", help="Path to your .env file."
+    )
+    parser.add_argument(
+        "-s",
+        "--stations",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Stations to migrate. If not provided, all stations are migrated.",
+    )
+    args = parser.parse_args()
+    load_dotenv(args.env)
+
+    credentials = dict(
+        uri=os.getenv("Neo4jURI"),
+        user=os.getenv("Neo4jUser"),
+        password=os.getenv("Neo4jPassword"),
+    )
+    source = MesonetSatelliteDB(**credentials)
+    series = MesonetSeriesDB(**credentials)
+
+    try:
+        series.init_db_indices()
+        series.migrate_from(source, stations=args.stations)
+    finally:
+        source.close()
+        series.close()
@@ -0,0 +1,57 @@
+import argparse
+
+from mt_mesonet_satellite import MesonetSatelliteDB, write_admin_import
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        "Rebuild the satellite indicators Neo4j database from AppEEARS files using neo4j-admin import."
+    )
+    parser.add_argument(
+        "-d",
+        "--dirname",
+        type=str,
+        required=True,
+        help="Directory containing the AppEEARS .csv files.",
+    )
+    parser.add_argument(
+        "-ul",
+        "--neo4jpth",
+        type=str,
+        default="/neo4j/import",
+        help="Path to the linked Neo4j 'import' volume.",
+    )
+    parser.add_argument(
+        "-i",
+        "--import-dir",
+        type=str,
+        default="/var/lib/neo4j/import",
+        help="Path of the 'import' volume as seen by neo4j-admin (inside the container).",
+    )
+    parser.add_argument(
+        "--database", type=str, default="neo4j", help="Database to import into."
+    )
+    parser.add_argument(
+        "--admin",
+        type=str,
+        default="docker exec neo4j neo4j-admin",
+        help="Command used to run neo4j-admin.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only write the import files and print the neo4j-admin command.",
+    )
+    args = parser.parse_args()
+
+    write_admin_import(args.dirname, args.neo4jpth)
+
+    # The database must be stopped and empty before running the import.
+    cmd = MesonetSatelliteDB.rebuild(
+        import_dir=args.import_dir,
+        database=args.database,
+        neo4j_admin=args.admin.split(),
+        dry_run=args.dry_run,
+    )
+    if args.dry_run:
+        print(" ".join(cmd))
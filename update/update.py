@@ -1,12 +1,20 @@
 #!/usr/local/bin/python
 
+import argparse
 import os
 import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
 from loguru import logger
-from mt_mesonet_satellite import MesonetSatelliteDB, Session, operational_update
+from mt_mesonet_satellite import (
+    KeyIndex,
+    MesonetSatelliteDB,
+    MesonetSeriesDB,
+    ParquetObservationStore,
+    Session,
+    operational_update,
+)
 from neo4j.exceptions import ConfigurationError
 
 # from mt_mesonet_satellite import Task, Submit, clean_all, to_db_format, Product, Point
@@ -32,15 +40,43 @@ logger.enable("mt_mesonet_satellite")
 
 if __name__ == "__main__":
 
-    try:
-        conn = MesonetSatelliteDB(
-            uri=os.getenv("Neo4jURI"),
-            user=os.getenv("Neo4jUser"),
-            password=os.getenv("Neo4jPassword"),
-        )
-    except ConfigurationError as e:
-        logger.exception(e)
-        logger.exception("Unable to connect to Neo4j DB.")
+    parser = argparse.ArgumentParser("Download and store new satellite data.")
+    parser.add_argument(
+        "-p",
+        "--parquet",
+        type=str,
+        default=os.getenv("ParquetStore"),
+        help="Directory of a Parquet observation store to update. If not provided, the Neo4j database is updated.",
+    )
+    parser.add_argument(
+        "-s",
+        "--series",
+        action="store_true",
+        help="Update a Neo4j database that uses the yearly Series node layout.",
+    )
+    parser.add_argument(
+        "-k",
+        "--key-index",
+        type=str,
+        default=os.getenv("KeyIndex"),
+        help="Path to a .npy index of stored observation keys used to skip known observations.",
+    )
+    args = parser.parse_args()
+    key_index = KeyIndex(args.key_index) if args.key_index else None
+
+    if args.parquet:
+        conn = ParquetObservationStore(args.parquet)
+    else:
+        db = MesonetSeriesDB if args.series else MesonetSatelliteDB
+        try:
+            conn = db(
+                uri=os.getenv("Neo4jURI"),
+                user=os.getenv("Neo4jUser"),
+                password=os.getenv("Neo4jPassword"),
+            )
+        except ConfigurationError as e:
+            logger.exception(e)
+            logger.exception("Unable to connect to Neo4j DB.")
 
     try:
         session = Session(dot_env=True)
@@ -48,7 +84,7 @@ if __name__ == "__main__":
         logger.exception(e)
 
     try:
-        operational_update(conn=conn, session=session)
+        operational_update(conn=conn, session=session, key_index=key_index)
     finally:
         session.logout()
         conn.close()